@@ -1,10 +1,17 @@
+import mimetypes
 import os
-from flask import Flask, render_template, send_from_directory
+import re
+from flask import Flask, Response, abort, render_template, request, send_from_directory
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.security import safe_join
 
 from config import Config
 from database import db
+from utils.assets import DIST_DIR, IMMUTABLE_MAX_AGE, asset_url, precompressed_variant
+
+# Uploads named by content hash (optionally with a thumbnail size suffix) never change
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}(_\d+)?\.[a-z0-9]+$")
 
 
 def create_app():
@@ -14,11 +21,23 @@ def create_app():
     # Ensure upload directory exists
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
+    # Let the front-end web server stream files (applies to every send_file response)
+    if app.config.get("UPLOAD_OFFLOAD") == "x-sendfile":
+        app.config["USE_X_SENDFILE"] = True
+
+    app.jinja_env.globals["asset_url"] = asset_url
+
     # Extensions
     db.init_app(app)
     JWTManager(app)
     CORS(app)
 
+    # Reference counting for content-addressed uploads
+    import services.upload_store  # noqa: F401 — registers the session hooks
+    # Per-student model features, kept in sync with profile writes
+    import services.feature_store  # noqa: F401 — registers the session hooks
+    import services.prediction_store  # noqa: F401 — refreshes stored predictions after commits
+
     # Attach Activity Logging Middleware
     from services.logging_service import setup_logging_middleware
     setup_logging_middleware(app)
@@ -56,6 +75,31 @@ def create_app():
         except Exception as e:
             print(f"[DB] Could not sync AdminTable: {e}")
 
+        # Build department statistics for databases created before they existed
+        try:
+            from services.department_stats import ensure_department_stats
+            ensure_department_stats()
+        except Exception as e:
+            print(f"[DB] Could not build department statistics: {e}")
+
+        try:
+            from services.feature_store import ensure_feature_store
+            ensure_feature_store()
+        except Exception as e:
+            print(f"[DB] Could not build the student feature store: {e}")
+
+        # Move activity logs out of the main database and start the retention job
+        try:
+            from services.activity_analytics import ensure_activity_rollups
+            from services.log_retention import migrate_legacy_activity_log, schedule_log_retention
+            copied = migrate_legacy_activity_log()
+            if copied:
+                print(f"[DB] Moved {copied} activity logs to the activity database.")
+            ensure_activity_rollups()
+            schedule_log_retention(app)
+        except Exception as e:
+            print(f"[DB] Could not set up activity log retention: {e}")
+
         # Auto-train ML models if not already trained
         try:
             from services.ml_service import train_models
@@ -67,6 +111,18 @@ def create_app():
         except Exception as e:
             print(f"[ML] Could not auto-train models: {e}")
 
+        # Delete uploads that lost their last reference, also when no later commit releases one
+        from services.upload_store import schedule_upload_collection
+        schedule_upload_collection(app)
+
+        # Score students whose stored predictions are missing or from an older model
+        try:
+            from services.prediction_store import ensure_prediction_store, schedule_prediction_refresh
+            ensure_prediction_store()
+            schedule_prediction_refresh(app)
+        except Exception as e:
+            print(f"[ML] Could not schedule prediction refresh: {e}")
+
     # ─── Page routes ───
 
     @app.route("/")
@@ -77,9 +133,50 @@ def create_app():
     def dashboard():
         return render_template("dashboard.html")
 
+    @app.route("/static/dist/<path:filename>")
+    def serve_built_asset(filename):
+        """Fingerprinted static files from build_assets.py, precompressed when possible."""
+        path = safe_join(DIST_DIR, filename)
+        if not path or not os.path.isfile(path):
+            abort(404)
+        send_path, encoding = precompressed_variant(path, request.headers.get("Accept-Encoding", ""))
+        response = send_from_directory(
+            DIST_DIR,
+            os.path.relpath(send_path, DIST_DIR),
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=IMMUTABLE_MAX_AGE,
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.immutable = True
+        return response
+
     @app.route("/uploads/<path:filename>")
     def serve_upload(filename):
-        return send_from_directory(app.config["UPLOAD_FOLDER"], filename)
+        immutable = bool(CONTENT_ADDRESSED_NAME.match(os.path.basename(filename)))
+
+        if app.config.get("UPLOAD_OFFLOAD") == "x-accel":
+            path = safe_join(app.config["UPLOAD_FOLDER"], filename)
+            if not path or not os.path.isfile(path):
+                abort(404)
+            # nginx serves the bytes (including Range and conditional requests)
+            response = Response(mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+            response.headers["X-Accel-Redirect"] = f"{app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/')}/{filename}"
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE if immutable else 0
+        else:
+            # ETag, If-None-Match/If-Modified-Since and Range are handled by send_file
+            response = send_from_directory(
+                app.config["UPLOAD_FOLDER"], filename,
+                conditional=True, max_age=IMMUTABLE_MAX_AGE if immutable else 0,
+            )
+        # Resumes and photos are personal data: browser cache only, never shared proxies/CDNs
+        # (send_file marks responses with a max_age as public)
+        response.cache_control.public = False
+        response.cache_control.private = True
+        if immutable:
+            response.cache_control.immutable = True
+        return response
 
     return app
 
@@ -0,0 +1,143 @@
+"""Benchmark the per-request cost of the activity logging middleware.
+
+Runs the after_request hook directly for a few representative requests
+(inside a request context where the route's JWT check has already run)
+and prints the mean time per call. Log entries are not written, so only
+the classification, identity and payload work is measured.
+
+With --baseline the hook as it was before requests were classified by
+endpoint (path rules on every response, a second JWT decode, a copy of
+every JSON body) is measured as well, in a "before" column.
+
+Usage: python bench_logging_middleware.py [--baseline] [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from flask import request  # noqa: E402
+from flask_jwt_extended import create_access_token, get_jwt_identity, verify_jwt_in_request  # noqa: E402
+
+import services.logging_service as logging_service  # noqa: E402
+from app import create_app  # noqa: E402
+
+SCENARIOS = [
+    ("unlogged GET", "GET", "/api/student/profile", None),
+    ("login", "POST", "/api/auth/login", {"username": "student1", "password": "secret"}),
+    ("apply", "POST", "/api/student/placements/7/apply", None),
+    ("status update", "PUT", "/api/company/applications/3/status", {"status": "selected"}),
+    ("profile update", "PUT", "/api/student/profile", {"full_name": "A Student", "skills": ["python"] * 20}),
+    ("admin action", "POST", "/api/admin/users", {"username": "new", "password": "x", "email": "n@x"}),
+]
+
+
+def baseline_log_user_activity(response):
+    """The after_request hook before endpoint classification, minus the enqueue."""
+    path = request.path
+    method = request.method
+
+    if path.startswith("/static/") or method == "OPTIONS":
+        return response
+
+    action_type = None
+    description = None
+    if path == "/api/auth/login" and method == "POST":
+        action_type = "LOGIN"
+        description = "User authenticated successfully" if response.status_code == 200 else "Failed login attempt"
+    elif path.startswith("/api/student/placements/") and path.endswith("/apply") and method == "POST":
+        action_type = "APPLY_INTERNSHIP"
+        opp_id = path.split("/")[4]
+        description = f"Student applied for placement opportunity ID: {opp_id}"
+    elif path.startswith("/api/company/applications/") and path.endswith("/status") and method == "PUT":
+        action_type = "STATUS_UPDATE"
+        record_id = path.split("/")[4]
+        description = f"Company updated application record ID: {record_id}"
+    elif path == "/api/student/profile" and method in ["PUT", "POST"]:
+        action_type = "UPDATE_PROFILE"
+        description = "Student generated or updated their profile"
+    elif path.startswith("/api/ml/predict") or path.startswith("/api/ml/recommend"):
+        action_type = "MODEL_PREDICTION"
+        description = "Machine learning model processing request"
+    elif path.startswith("/api/admin/") and method in ["POST", "PUT", "DELETE"]:
+        action_type = "ADMIN_ACTION"
+        description = f"Admin modification request on {path}"
+
+    if not action_type:
+        return response
+
+    user_id = None
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        if identity:
+            user_id = int(identity)
+    except Exception:
+        pass
+
+    payload_data = None
+    if request.is_json:
+        try:
+            raw_json = request.get_json(silent=True)
+            if raw_json:
+                clean_json = dict(raw_json)
+                if "password" in clean_json:
+                    clean_json["password"] = "***"
+                payload_data = clean_json
+        except Exception:
+            pass
+
+    log_data = {  # noqa: F841 — built as before; the enqueue itself is not measured
+        "user_id": user_id,
+        "action_type": action_type,
+        "description": description,
+        "endpoint": path,
+        "method": method,
+        "payload": payload_data,
+        "status_code": response.status_code,
+        "ip_address": request.remote_addr or "127.0.0.1",
+        "timestamp": datetime.utcnow()
+    }
+    return response
+
+
+def time_hook(app, hook, method, path, body, headers, iterations):
+    with app.test_request_context(path, method=method, json=body, headers=headers):
+        verify_jwt_in_request(optional=True)  # what the route's decorator already did
+        response = app.response_class(status=200)
+        hook(response)  # warm up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            hook(response)
+        elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1e6
+
+
+def main(iterations, baseline=False):
+    app = create_app()
+    logging_service.start_async_log = lambda app, log_data: None
+
+    middleware = next(f for f in app.after_request_funcs[None] if f.__name__ == "log_user_activity")
+    with app.app_context():
+        token = create_access_token(identity="1", additional_claims={"role": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    if baseline:
+        print(f"{'scenario':<16}{'before':>10}{'after':>10}  (us/request)")
+    else:
+        print(f"{'scenario':<16}{'us/request':>12}")
+    for name, method, path, body in SCENARIOS:
+        after = time_hook(app, middleware, method, path, body, headers, iterations)
+        if baseline:
+            before = time_hook(app, baseline_log_user_activity, method, path, body, headers, iterations)
+            print(f"{name:<16}{before:>10.1f}{after:>10.1f}")
+        else:
+            print(f"{name:<16}{after:>12.1f}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--baseline"]
+    main(int(args[0]) if args else 20000, baseline="--baseline" in sys.argv[1:])
@@ -0,0 +1,9 @@
+"""Fingerprint and precompress static/ into static/dist/ (run on every deploy)."""
+from utils.assets import brotli, build_assets
+
+
+if __name__ == "__main__":
+    manifest = build_assets()
+    print(f"[+] Built {len(manifest)} static assets into static/dist/.")
+    if brotli is None:
+        print("[!] 'brotli' is not installed — only gzip variants were written.")
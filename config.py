@@ -12,10 +12,47 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///placement.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Activity logs live in a separate database (relative SQLite paths resolve to instance/)
+    SQLALCHEMY_BINDS = {
+        "activity": os.getenv("ACTIVITY_DATABASE_URL", "sqlite:///activity.db"),
+    }
 
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+    # Generated reports contain personal data, so they live outside the public uploads folder
+    REPORT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "reports")
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5 MB global max
 
+    # Upload serving: "" (Flask streams the file), "x-sendfile" (Apache/lighttpd)
+    # or "x-accel" (nginx internal location mapped at UPLOAD_ACCEL_PREFIX)
+    UPLOAD_OFFLOAD = os.getenv("UPLOAD_OFFLOAD", "")
+    UPLOAD_ACCEL_PREFIX = os.getenv("UPLOAD_ACCEL_PREFIX", "/protected-uploads")
+
+    # Evaluation chart rendering pool
+    CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "2"))
+    CHART_RENDER_QUEUE_DEPTH = int(os.getenv("CHART_RENDER_QUEUE_DEPTH", "8"))  # waiting renders beyond busy workers
+    CHART_RENDER_TIMEOUT = float(os.getenv("CHART_RENDER_TIMEOUT", "15"))  # seconds
+
+    # Activity log writer: entries are bulk-inserted every N entries or T milliseconds
+    ACTIVITY_LOG_BATCH_SIZE = int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "200"))
+    ACTIVITY_LOG_FLUSH_MS = int(os.getenv("ACTIVITY_LOG_FLUSH_MS", "500"))
+    ACTIVITY_LOG_QUEUE_SIZE = int(os.getenv("ACTIVITY_LOG_QUEUE_SIZE", "10000"))
+    ACTIVITY_LOG_OVERFLOW_POLICY = os.getenv("ACTIVITY_LOG_OVERFLOW_POLICY", "drop")  # "drop" or "sample"
+    ACTIVITY_LOG_OVERFLOW_SAMPLE_RATE = float(os.getenv("ACTIVITY_LOG_OVERFLOW_SAMPLE_RATE", "0.1"))
+    # Per action type: "always", "sample:<rate>" or "aggregate" (per-window summary rows); unlisted types log always
+    ACTIVITY_LOG_POLICIES = os.getenv("ACTIVITY_LOG_POLICIES", "MODEL_PREDICTION=aggregate")
+    ACTIVITY_LOG_AGGREGATE_SECONDS = int(os.getenv("ACTIVITY_LOG_AGGREGATE_SECONDS", "60"))
+    # Rows older than this are moved to monthly gzip NDJSON archives (0 disables the job)
+    ACTIVITY_LOG_RETENTION_DAYS = int(os.getenv("ACTIVITY_LOG_RETENTION_DAYS", "90"))
+    ACTIVITY_LOG_ARCHIVE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "activity_archive")
+    # Student login records that could not be inserted after every retry are appended here as NDJSON
+    STUDENT_LOGIN_SPILL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "unsaved_student_logins.ndjson")
+
+    # Password hashing: werkzeug method string; hashes with other parameters are upgraded on login
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "32"))  # waiting checks beyond busy workers
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))  # seconds
+
     ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "rishitha")
     ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "rishitha123")
     ADMIN_EMAIL = os.getenv("ADMIN_EMAIL", "admin@university.edu")
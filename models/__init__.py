@@ -1,7 +1,12 @@
 from models.user import User
 from models.student_profile import StudentProfile
 from models.placement import PlacementOpportunity, PlacementRecord
-from models.tracking import StudentLoginLog, CompanyTable, AdminTable, ActivityLog
+from models.tracking import StudentLoginLog, CompanyTable, AdminTable, ActivityLog, ActivityRollup
+from models.department_stats import DepartmentStats, DepartmentStatBin
+from models.stored_file import StoredFile
+from models.report_job import ReportJob
+from models.student_features import StudentFeatures
+from models.student_prediction import StudentPrediction
 
 __all__ = [
     "User",
@@ -12,4 +17,11 @@ __all__ = [
     "CompanyTable",
     "AdminTable",
     "ActivityLog",
+    "ActivityRollup",
+    "DepartmentStats",
+    "DepartmentStatBin",
+    "StoredFile",
+    "ReportJob",
+    "StudentFeatures",
+    "StudentPrediction",
 ]
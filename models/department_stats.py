@@ -0,0 +1,49 @@
+from datetime import datetime
+from database import db
+
+
+class DepartmentStats(db.Model):
+    """Running totals over verified student profiles, one row per department.
+
+    Maintained incrementally by ``services.department_stats``; never edit by hand.
+    """
+    __tablename__ = "department_stats"
+
+    department = db.Column(db.String(80), primary_key=True)  # "" for profiles without a department
+    student_count = db.Column(db.Integer, nullable=False, default=0)
+    cgpa_count = db.Column(db.Integer, nullable=False, default=0)
+    cgpa_sum = db.Column(db.Float, nullable=False, default=0.0)
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def cgpa_mean(self):
+        return self.cgpa_sum / self.cgpa_count if self.cgpa_count else None
+
+    @property
+    def score_mean(self):
+        return self.score_sum / self.score_count if self.score_count else None
+
+    def to_dict(self):
+        return {
+            "department": self.department,
+            "student_count": self.student_count,
+            "cgpa_mean": round(self.cgpa_mean, 2) if self.cgpa_mean is not None else None,
+            "employability_mean": round(self.score_mean, 2) if self.score_mean is not None else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class DepartmentStatBin(db.Model):
+    """Fixed-width histogram bin used as a percentile sketch.
+
+    ``metric`` is "cgpa" (0.1-wide bins over 0-10) or "score" (1-point bins
+    over 0-100); ``bin`` is the bin index.
+    """
+    __tablename__ = "department_stat_bins"
+
+    department = db.Column(db.String(80), primary_key=True)
+    metric = db.Column(db.String(10), primary_key=True)
+    bin = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
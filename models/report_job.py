@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+from database import db
+
+
+class ReportJob(db.Model):
+    __tablename__ = "report_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(20), nullable=False, default="pdf")
+    filters = db.Column(db.Text, default="{}")  # canonical JSON
+    filters_key = db.Column(db.String(64), nullable=False, index=True)  # sha256 of kind + filters
+    data_fingerprint = db.Column(db.String(128), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued / running / done / failed / expired
+    file_path = db.Column(db.String(256), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    requested_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        try:
+            filters = json.loads(self.filters) if self.filters else {}
+        except (json.JSONDecodeError, TypeError):
+            filters = {}
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "filters": filters,
+            "status": self.status,
+            "error": self.error,
+            "requested_by": self.requested_by,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
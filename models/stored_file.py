@@ -0,0 +1,23 @@
+from datetime import datetime
+from database import db
+
+
+class StoredFile(db.Model):
+    """Reference count for a content-addressed upload.
+
+    Maintained by ``services.upload_store`` from StudentProfile.resume_path,
+    photo_path and documents; files whose count drops to zero are garbage
+    collected after a grace period.
+    """
+    __tablename__ = "stored_files"
+
+    path = db.Column(db.String(256), primary_key=True)  # e.g. "uploads/photo/<sha256>.png"
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "ref_count": self.ref_count,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,39 @@
+from datetime import datetime
+from database import db
+
+
+class StudentFeatures(db.Model):
+    """Typed model features derived from a StudentProfile, one row per profile.
+
+    Maintained by ``services.feature_store`` on every profile write; never edit
+    by hand. The first five feature columns are the model input vector, in
+    ``services.ml_service.FEATURE_NAMES`` order.
+    """
+    __tablename__ = "student_features"
+
+    profile_id = db.Column(db.Integer, db.ForeignKey("student_profiles.id", ondelete="CASCADE"), primary_key=True)
+    cgpa = db.Column(db.Float, nullable=False, default=0.0)
+    programming_skills = db.Column(db.Integer, nullable=False, default=0)
+    soft_skills = db.Column(db.Integer, nullable=False, default=0)
+    internship_count = db.Column(db.Integer, nullable=False, default=0)
+    certification_count = db.Column(db.Integer, nullable=False, default=0)
+    project_count = db.Column(db.Integer, nullable=False, default=0)
+    skill_count = db.Column(db.Integer, nullable=False, default=0)
+    document = db.Column(db.Text, nullable=False, default="")  # skills + projects text for recommendations
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def model_input(self):
+        return [self.cgpa, self.programming_skills, self.soft_skills, self.internship_count, self.certification_count]
+
+    def to_dict(self):
+        return {
+            "profile_id": self.profile_id,
+            "cgpa": self.cgpa,
+            "programming_skills": self.programming_skills,
+            "soft_skills": self.soft_skills,
+            "internship_count": self.internship_count,
+            "certification_count": self.certification_count,
+            "project_count": self.project_count,
+            "skill_count": self.skill_count,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
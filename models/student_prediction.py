@@ -0,0 +1,32 @@
+from datetime import datetime
+from database import db
+
+
+class StudentPrediction(db.Model):
+    """Stored model outputs for a StudentProfile, one row per profile.
+
+    Maintained by ``services.prediction_store``; never edit by hand. Every
+    change of the profile's features bumps ``revision`` and sets ``dirty``;
+    a refresh clears ``dirty`` only if the revision it scored is still current.
+    """
+    __tablename__ = "student_predictions"
+
+    profile_id = db.Column(db.Integer, db.ForeignKey("student_profiles.id", ondelete="CASCADE"), primary_key=True)
+    placement_probability = db.Column(db.Float, nullable=True, index=True)  # 0-1, None until first scored
+    predicted_salary_lpa = db.Column(db.Float, nullable=True, index=True)
+    predicted_salary_min = db.Column(db.Float, nullable=True)  # 10th/90th percentile of the trees
+    predicted_salary_max = db.Column(db.Float, nullable=True)
+    model_version = db.Column(db.String(16), nullable=True, index=True)
+    revision = db.Column(db.Integer, nullable=False, default=1)
+    dirty = db.Column(db.Boolean, nullable=False, default=True, index=True)
+    scored_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "placement_probability": round(self.placement_probability, 4) if self.placement_probability is not None else None,
+            "predicted_salary_lpa": self.predicted_salary_lpa,
+            "predicted_salary_range": {"min": self.predicted_salary_min, "max": self.predicted_salary_max},
+            "model_version": self.model_version,
+            "stale": bool(self.dirty),
+            "scored_at": self.scored_at.isoformat() if self.scored_at else None,
+        }
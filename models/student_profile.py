@@ -1,6 +1,7 @@
 import json
 from datetime import datetime
 from database import db
+from utils.thumbnails import THUMBNAIL_FORMATS, THUMBNAIL_SIZES, thumbnail_path, thumbnails_ready
 
 
 class StudentProfile(db.Model):
@@ -52,6 +53,15 @@ class StudentProfile(db.Model):
         except (json.JSONDecodeError, TypeError):
             return []
 
+    def _photo_thumbnails(self):
+        # Only advertised once generated; until then clients use photo_path
+        if not self.photo_path or not thumbnails_ready(self.photo_path):
+            return None
+        return {
+            str(size): {fmt: thumbnail_path(self.photo_path, size, fmt) for fmt in THUMBNAIL_FORMATS}
+            for size in THUMBNAIL_SIZES
+        }
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -72,6 +82,7 @@ class StudentProfile(db.Model):
             "career_preferences": self.career_preferences,
             "resume_path": self.resume_path,
             "photo_path": self.photo_path,
+            "photo_thumbnails": self._photo_thumbnails(),
             "documents": self._parse_json(self.documents),
             "is_verified": self.is_verified,
             "placement_status": self.placement_status,
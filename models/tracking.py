@@ -54,9 +54,14 @@ class AdminTable(db.Model):
 
 class ActivityLog(db.Model):
     __tablename__ = "activity_log"
+    # Kept in its own database so log volume never competes with transactional
+    # writes; user_id therefore cannot be a foreign key to users.
+    __bind_key__ = "activity"
+    # Never reuse ids of archived rows; archive readers de-duplicate on id
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)
     action_type = db.Column(db.String(50), nullable=False, index=True)
     description = db.Column(db.Text, nullable=True)
     endpoint = db.Column(db.String(255), nullable=True)
@@ -79,3 +84,28 @@ class ActivityLog(db.Model):
             "timestamp": self.timestamp.isoformat() if self.timestamp else None,
             "ip_address": self.ip_address,
         }
+
+
+class ActivityRollup(db.Model):
+    """Request counts per action type and hour/day bucket.
+
+    Maintained incrementally by the activity log writer
+    (``services.activity_analytics``); never edit by hand.
+    """
+    __tablename__ = "activity_rollup"
+    __bind_key__ = "activity"
+
+    interval = db.Column(db.String(4), primary_key=True)  # "hour" or "day"
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    action_type = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)  # requests, with sampled/aggregated rows expanded
+    error_count = db.Column(db.Integer, nullable=False, default=0)  # requests answered with status >= 400
+
+    def to_dict(self):
+        return {
+            "interval": self.interval,
+            "bucket_start": self.bucket_start.isoformat() if self.bucket_start else None,
+            "action_type": self.action_type,
+            "count": self.count,
+            "error_count": self.error_count,
+        }
@@ -1,14 +1,24 @@
+import itertools
 import json
-from flask import Blueprint, request, jsonify, Response
+import os
+from datetime import datetime
+from flask import Blueprint, current_app, request, jsonify, Response, send_file, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 from database import db
 from models.user import User
 from models.student_profile import StudentProfile
 from models.placement import PlacementOpportunity, PlacementRecord
-from services.employability import recalculate_and_save
-from services.report_service import generate_csv_report, generate_pdf_report
+from models.report_job import ReportJob
+from services.activity_analytics import INTERVALS, parse_time, query_counts, query_events
+from services.employability import bulk_recalculate_scores, recalculate_and_save
+from services.log_retention import archive_old_activity_logs, iter_activity_logs
+from services.logging_service import get_log_writer_stats
+from services.prediction_store import parse_prediction_filters
+from services.report_jobs import request_pdf_report
+from services.report_service import EXPORT_FORMATS
 from utils.decorators import role_required
+from utils.identity import invalidate_identity
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/api/admin")
 
@@ -81,6 +91,7 @@ def edit_user(user_id):
         user.set_password(data["password"])
 
     db.session.commit()
+    invalidate_identity(user.id)
     return jsonify({"message": "User updated", "user": user.to_dict()}), 200
 
 
@@ -93,6 +104,7 @@ def delete_user(user_id):
         return jsonify({"error": "User not found"}), 404
     user.is_active = False
     db.session.commit()
+    invalidate_identity(user.id)
     return jsonify({"message": "User deactivated"}), 200
 
 
@@ -169,7 +181,11 @@ def verify_student(profile_id):
 @admin_bp.route("/reports", methods=["GET"])
 @role_required("admin")
 def get_csv_report():
-    """Generate CSV report of students."""
+    """Stream a report of students as CSV (default), NDJSON, Parquet or XLSX."""
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
     filters = {
         "department": request.args.get("department"),
         "min_cgpa": request.args.get("min_cgpa"),
@@ -177,18 +193,26 @@ def get_csv_report():
         "placement_status": request.args.get("placement_status"),
         "verified_only": request.args.get("verified_only"),
     }
-    csv_data = generate_csv_report(filters)
+    try:
+        filters.update(parse_prediction_filters(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    generate, mimetype, extension = EXPORT_FORMATS[export_format]
+    try:
+        chunks = generate(filters)
+    except ImportError as e:
+        return jsonify({"error": f"{export_format} export is not available on this server: {e}"}), 501
     return Response(
-        csv_data,
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment; filename=student_report.csv"},
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=student_report.{extension}"},
     )
 
 
-@admin_bp.route("/reports/pdf", methods=["GET"])
+@admin_bp.route("/reports/pdf", methods=["POST"])
 @role_required("admin")
-def get_pdf_report():
-    """Generate PDF report of students."""
+def request_pdf_report_job():
+    """Queue a PDF report of students; poll the returned job (GET /reports/jobs/<id>) until it is done."""
     filters = {
         "department": request.args.get("department"),
         "min_cgpa": request.args.get("min_cgpa"),
@@ -196,12 +220,41 @@ def get_pdf_report():
         "placement_status": request.args.get("placement_status"),
         "verified_only": request.args.get("verified_only"),
     }
-    pdf_data = generate_pdf_report(filters)
-    return Response(
-        pdf_data,
-        mimetype="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=student_report.pdf"},
-    )
+    job, reused = request_pdf_report(filters, int(get_jwt_identity()))
+    result = job.to_dict()
+    result["reused"] = reused
+    return jsonify(result), 200 if job.status == "done" else 202
+
+
+@admin_bp.route("/reports/jobs", methods=["GET"])
+@role_required("admin")
+def list_report_jobs():
+    """List the most recent report jobs."""
+    jobs = ReportJob.query.order_by(ReportJob.created_at.desc()).limit(20).all()
+    return jsonify([j.to_dict() for j in jobs]), 200
+
+
+@admin_bp.route("/reports/jobs/<job_id>", methods=["GET"])
+@role_required("admin")
+def get_report_job(job_id):
+    """Get the status of a report job."""
+    job = db.session.get(ReportJob, job_id)
+    if not job:
+        return jsonify({"error": "Report job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@admin_bp.route("/reports/jobs/<job_id>/download", methods=["GET"])
+@role_required("admin")
+def download_report_job(job_id):
+    """Download the PDF produced by a finished report job."""
+    job = db.session.get(ReportJob, job_id)
+    if not job:
+        return jsonify({"error": "Report job not found"}), 404
+    if job.status != "done" or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify({"error": f"Report is not available (status: {job.status})"}), 409
+    return send_file(job.file_path, mimetype="application/pdf", as_attachment=True,
+                     download_name="student_report.pdf", max_age=0)
 
 
 # ──────────────── Placement Opportunities ────────────────
@@ -306,13 +359,93 @@ def placement_status():
 @role_required("admin")
 def recalculate_all_scores():
     """Recalculate employability scores for all students."""
-    profiles = StudentProfile.query.all()
-    count = 0
-    for p in profiles:
-        recalculate_and_save(p, db)
-        count += 1
-    db.session.commit()
-    return jsonify({"message": f"Recalculated scores for {count} students"}), 200
+    result = bulk_recalculate_scores(db)
+    result["message"] = (f"Recalculated scores for {result['processed']} students "
+                         f"({result['updated']} changed, {result['rows_per_sec']} rows/sec)")
+    return jsonify(result), 200
+
+
+# ──────────────── Activity Logging ────────────────
+
+@admin_bp.route("/logging/stats", methods=["GET"])
+@role_required("admin")
+def activity_log_stats():
+    """Counters of the buffered activity log writer."""
+    return jsonify(get_log_writer_stats() or {}), 200
+
+
+@admin_bp.route("/logging/archive", methods=["POST"])
+@role_required("admin")
+def archive_activity_logs():
+    """Run the activity log retention job now."""
+    data = request.get_json(silent=True) or {}
+    try:
+        days = int(data.get("retention_days", current_app.config["ACTIVITY_LOG_RETENTION_DAYS"]))
+    except (TypeError, ValueError):
+        return jsonify({"error": "retention_days must be an integer"}), 400
+    if days <= 0:
+        return jsonify({"error": "retention_days must be positive"}), 400
+    archived = archive_old_activity_logs(days, current_app.config["ACTIVITY_LOG_ARCHIVE_FOLDER"])
+    return jsonify({"archived": archived, "retention_days": days}), 200
+
+
+@admin_bp.route("/logging/logs", methods=["GET"])
+@role_required("admin")
+def query_activity_logs():
+    """Query activity logs across archived and live data, oldest first."""
+    try:
+        start = parse_time(request.args.get("start"))
+        end = parse_time(request.args.get("end"))
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO 8601 dates"}), 400
+    limit = min(request.args.get("limit", 500, type=int), 5000)
+
+    logs = iter_activity_logs(
+        current_app.config["ACTIVITY_LOG_ARCHIVE_FOLDER"], start, end,
+        action_type=request.args.get("action_type"),
+        user_id=request.args.get("user_id", type=int),
+    )
+    return jsonify(list(itertools.islice(logs, limit))), 200
+
+
+# ──────────────── Activity Analytics ────────────────
+
+@admin_bp.route("/activity/events", methods=["GET"])
+@role_required("admin")
+def activity_events():
+    """Raw activity events, newest first. Pass next_cursor back as before_id for the next page."""
+    try:
+        start = parse_time(request.args.get("start"))
+        end = parse_time(request.args.get("end"))
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO 8601 dates"}), 400
+
+    events, next_cursor = query_events(
+        user_id=request.args.get("user_id", type=int),
+        action_type=request.args.get("action_type"),
+        start=start,
+        end=end,
+        before_id=request.args.get("before_id", type=int),
+        limit=request.args.get("limit", 100, type=int),
+    )
+    return jsonify({"events": events, "next_cursor": next_cursor}), 200
+
+
+@admin_bp.route("/activity/counts", methods=["GET"])
+@role_required("admin")
+def activity_counts():
+    """Hourly or daily request counts per action type."""
+    interval = request.args.get("interval", "hour")
+    if interval not in INTERVALS:
+        return jsonify({"error": f"interval must be one of: {', '.join(INTERVALS)}"}), 400
+    try:
+        start = parse_time(request.args.get("start"))
+        end = parse_time(request.args.get("end"))
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO 8601 dates"}), 400
+
+    series = query_counts(interval, start, end, action_type=request.args.get("action_type"))
+    return jsonify({"interval": interval, "series": series}), 200
 
 
 # ──────────────── Utility ────────────────
@@ -1,9 +1,12 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
+from flask import Blueprint, current_app, g, request, jsonify
+from flask_jwt_extended import create_access_token, jwt_required
 
 from database import db
 from models.user import User
-from models.tracking import StudentLoginLog, CompanyTable, AdminTable
+from models.tracking import CompanyTable, AdminTable
+from services.logging_service import record_student_login
+from services.password_service import PasswordHashBusy, needs_rehash, schedule_rehash, verify_password
+from utils.identity import current_user, lookup_profile_id
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
@@ -27,22 +30,32 @@ def login():
         return jsonify({"error": "Username and password are required"}), 400
 
     user = User.query.filter_by(username=username).first()
-    if not user or not user.check_password(password):
+    try:
+        valid = user is not None and verify_password(user.password_hash, password)
+    except PasswordHashBusy:
+        response = jsonify({"error": "Too many logins in progress. Please retry shortly."})
+        response.status_code = 503
+        response.headers["Retry-After"] = "1"
+        return response
+    if not valid:
         return jsonify({"error": "Invalid credentials"}), 401
 
     if not user.is_active:
         return jsonify({"error": "Account is deactivated"}), 403
 
-    # Explicit tracker for student logins as requested
+    # Explicit tracker for student logins as requested, written in the background
     if user.role == "student":
-        login_log = StudentLoginLog(user_id=user.id, username=user.username)
-        db.session.add(login_log)
-        db.session.commit()
+        record_student_login(current_app._get_current_object(), user)
+    g.activity_user_id = user.id
 
-    token = create_access_token(
-        identity=str(user.id),
-        additional_claims={"role": user.role, "username": user.username},
-    )
+    if needs_rehash(user.password_hash):
+        schedule_rehash(current_app._get_current_object(), user.id, user.password_hash, password)
+
+    claims = {"role": user.role, "username": user.username}
+    if user.role == "student":
+        # Lets student endpoints load the profile by primary key
+        claims["profile_id"] = lookup_profile_id(user.id)
+    token = create_access_token(identity=str(user.id), additional_claims=claims)
     return jsonify({"access_token": token, "role": user.role, "username": user.username}), 200
 
 
@@ -50,9 +63,7 @@ def login():
 @jwt_required()
 def me():
     """Return current user info from the JWT."""
-    claims = get_jwt()
-    user_id = get_jwt_identity()
-    user = User.query.get(int(user_id))
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
     return jsonify(user.to_dict()), 200
@@ -3,17 +3,43 @@ from flask import Blueprint, request, jsonify
 from models.student_profile import StudentProfile
 from models.user import User
 from models.placement import PlacementOpportunity
+from models.student_prediction import StudentPrediction
+from services.prediction_store import parse_prediction_filters, prediction_fields, with_predictions
+from services.ranking_service import METRICS as RANKED_METRICS, get_top
+from services.report_service import generate_company_summary
 from utils.decorators import role_required
 import json
 from flask_jwt_extended import get_jwt_identity
 
 company_bp = Blueprint("company", __name__, url_prefix="/api/company")
 
+BROWSE_SORTS = {
+    "employability": StudentProfile.employability_score,
+    "cgpa": StudentProfile.cgpa,
+    "placement_probability": StudentPrediction.placement_probability,
+    "predicted_salary": StudentPrediction.predicted_salary_lpa,
+}
+
 
 @company_bp.route("/students", methods=["GET"])
 @role_required("company")
 def browse_students():
-    """Browse verified student profiles with optional filters."""
+    """Browse verified student profiles with optional filters.
+
+    Each profile carries its stored placement probability and predicted
+    salary. ``sort`` is one of BROWSE_SORTS (default: employability),
+    ``order`` is ``desc`` (default) or ``asc``; ``min_placement_probability``
+    (0-1) and ``min_predicted_salary`` (LPA) filter on the predictions.
+    """
+    sort = request.args.get("sort", "employability")
+    if sort not in BROWSE_SORTS:
+        return jsonify({"error": f"Invalid sort. Must be one of: {list(BROWSE_SORTS)}"}), 400
+    order = request.args.get("order", "desc")
+    try:
+        prediction_filters = parse_prediction_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     query = StudentProfile.query.join(User).filter(
         StudentProfile.is_verified == True,
         User.is_active == True,
@@ -30,9 +56,15 @@ def browse_students():
     if skills:
         for skill in skills.split(","):
             query = query.filter(StudentProfile.skills.ilike(f"%{skill.strip()}%"))
+    query = with_predictions(query, prediction_filters)
 
-    profiles = query.order_by(StudentProfile.employability_score.desc()).all()
-    return jsonify([p.to_dict() for p in profiles]), 200
+    column = BROWSE_SORTS[sort]
+    column = column.asc() if order == "asc" else column.desc()
+    rows = query.order_by(column.nulls_last(), StudentProfile.id).all()
+    return jsonify([
+        dict(profile.to_dict(), **prediction_fields(prediction))
+        for profile, prediction in rows
+    ]), 200
 
 
 @company_bp.route("/students/<int:profile_id>", methods=["GET"])
@@ -45,35 +77,68 @@ def view_student(profile_id):
     return jsonify(profile.to_dict()), 200
 
 
-@company_bp.route("/reports", methods=["GET"])
+@company_bp.route("/leaderboard", methods=["GET"])
 @role_required("company")
-def view_reports():
-    """Company can access consolidated student data (verified only)."""
-    query = StudentProfile.query.filter(StudentProfile.is_verified == True)
+def leaderboard():
+    """Top verified students of a department ranked by employability or CGPA.
 
-    dept = request.args.get("department")
-    min_cgpa = request.args.get("min_cgpa")
+    Omit ``department`` for an institution-wide list.
+    """
+    metric = request.args.get("metric", "employability")
+    if metric not in RANKED_METRICS:
+        return jsonify({"error": f"Invalid metric. Must be one of: {list(RANKED_METRICS)}"}), 400
+    department = request.args.get("department")
+    top_n = max(1, min(request.args.get("top_n", 10, type=int), 100))
 
-    if dept:
-        query = query.filter(StudentProfile.department.ilike(f"%{dept}%"))
-    if min_cgpa:
-        query = query.filter(StudentProfile.cgpa >= float(min_cgpa))
+    top = get_top(department, metric, top_n)
+    profiles = {p.id: p for p in StudentProfile.query.filter(StudentProfile.id.in_([pid for pid, _ in top]))}
 
-    profiles = query.order_by(StudentProfile.employability_score.desc()).all()
+    results = []
+    for position, (profile_id, value) in enumerate(top, start=1):
+        profile = profiles.get(profile_id)
+        if not profile:
+            continue
+        entry = profile.to_dict()
+        entry["rank"] = position
+        entry["ranked_value"] = value
+        results.append(entry)
+
+    return jsonify({"department": department, "metric": metric, "leaderboard": results}), 200
 
-    summary = {
-        "total_students": len(profiles),
-        "average_cgpa": round(sum(p.cgpa for p in profiles) / len(profiles), 2) if profiles else 0,
-        "average_score": round(sum(p.employability_score for p in profiles) / len(profiles), 2) if profiles else 0,
-        "department_breakdown": {},
-        "students": [p.to_dict() for p in profiles],
-    }
 
-    for p in profiles:
-        dept_name = p.department or "Unknown"
-        if dept_name not in summary["department_breakdown"]:
-            summary["department_breakdown"][dept_name] = 0
-        summary["department_breakdown"][dept_name] += 1
+@company_bp.route("/reports", methods=["GET"])
+@role_required("company")
+def view_reports():
+    """Company can access consolidated student data (verified only).
+
+    The summary is aggregated in SQL. Pass ``include_students=true`` (with
+    optional ``page``/``per_page``) to also receive a page of profiles.
+    """
+    filters = {
+        "department": request.args.get("department"),
+        "min_cgpa": request.args.get("min_cgpa"),
+    }
+    summary = generate_company_summary(filters)
+
+    if request.args.get("include_students") in ("true", "1"):
+        page = request.args.get("page", 1, type=int)
+        per_page = min(request.args.get("per_page", 50, type=int), 200)
+        query = StudentProfile.query.filter(StudentProfile.is_verified == True)
+        if filters["department"]:
+            query = query.filter(StudentProfile.department.ilike(f"%{filters['department']}%"))
+        if filters["min_cgpa"]:
+            query = query.filter(StudentProfile.cgpa >= float(filters["min_cgpa"]))
+        query = with_predictions(query)
+        pagination = query.order_by(StudentProfile.employability_score.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        summary["students"] = [
+            dict(p.to_dict(), **prediction_fields(prediction))
+            for p, prediction in pagination.items
+        ]
+        summary["page"] = pagination.page
+        summary["per_page"] = pagination.per_page
+        summary["pages"] = pagination.pages
 
     return jsonify(summary), 200
 
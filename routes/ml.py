@@ -1,18 +1,25 @@
 """ML Prediction API routes."""
-import json
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import get_jwt, jwt_required
 
 from services.ml_service import (
+    INPUT_FIELDS,
+    MAX_SWEEP_AXES,
+    MAX_SWEEP_POINTS,
     train_models,
     predict_placement,
     predict_salary,
+    predict_sweep,
+    explain_cohort,
+    explain_prediction,
     get_feature_importances,
     get_training_metrics,
     recommend_students,
 )
-from models.student_profile import StudentProfile
+from services.feature_store import MODEL_INPUT_COLUMNS, feature_matrix, get_features
+from services.prediction_store import refresh_predictions, schedule_prediction_refresh
 from utils.decorators import role_required
+from utils.identity import current_profile
 
 ml_bp = Blueprint("ml", __name__, url_prefix="/api/ml")
 
@@ -22,9 +29,24 @@ ml_bp = Blueprint("ml", __name__, url_prefix="/api/ml")
 def train():
     """Train/retrain the ML models on the current dataset."""
     metrics = train_models()
+    # Stored predictions of the previous model version are rescored in the background
+    schedule_prediction_refresh(current_app._get_current_object())
     return jsonify({"message": "Models trained successfully", "metrics": metrics}), 200
 
 
+@ml_bp.route("/predictions/refresh", methods=["POST"])
+@role_required("admin")
+def refresh_stored_predictions():
+    """Rescore stale stored predictions now; ``?full=true`` rescores every student."""
+    result = refresh_predictions(full=request.args.get("full") in ("true", "1"))
+    return jsonify(result), 200
+
+
+def _wants_explanation(data=None):
+    """True when the caller asked for per-feature contributions (``?explain=true`` or ``"explain": true``)."""
+    return request.args.get("explain") in ("true", "1") or (data or {}).get("explain") is True
+
+
 @ml_bp.route("/predict/placement", methods=["POST"])
 @jwt_required()
 def predict_placement_status():
@@ -38,6 +60,10 @@ def predict_placement_status():
     certification_count = int(data.get("certification_count", 0))
 
     result = predict_placement(cgpa, programming_skills, soft_skills, internship_count, certification_count)
+    if _wants_explanation(data):
+        result["explanation"] = explain_prediction(
+            cgpa, programming_skills, soft_skills, internship_count, certification_count
+        )["placement"]
     result["input"] = {
         "cgpa": cgpa,
         "programming_skills_rating": programming_skills,
@@ -61,6 +87,10 @@ def predict_salary_package():
     certification_count = int(data.get("certification_count", 0))
 
     result = predict_salary(cgpa, programming_skills, soft_skills, internship_count, certification_count)
+    if _wants_explanation(data):
+        result["explanation"] = explain_prediction(
+            cgpa, programming_skills, soft_skills, internship_count, certification_count
+        )["salary"]
     result["input"] = {
         "cgpa": cgpa,
         "programming_skills_rating": programming_skills,
@@ -71,31 +101,101 @@ def predict_salary_package():
     return jsonify(result), 200
 
 
-@ml_bp.route("/predict/my-profile", methods=["GET"])
+def _sweep_values(spec):
+    """Values of one sweep axis: an explicit ``values`` list or inclusive ``start``/``stop``/``step``."""
+    if "values" in spec:
+        values = [float(v) for v in spec["values"]]
+    else:
+        start, stop = float(spec["start"]), float(spec["stop"])
+        step = float(spec.get("step", 1))
+        if step <= 0 or stop < start:
+            raise ValueError("step must be positive and stop >= start")
+        count = int((stop - start) / step + 1e-9) + 1
+        if count > MAX_SWEEP_POINTS:
+            raise ValueError(f"a sweep may have at most {MAX_SWEEP_POINTS} points")
+        values = [round(start + i * step, 6) for i in range(count)]
+    if not values:
+        raise ValueError("a sweep axis needs at least one value")
+    return values
+
+
+@ml_bp.route("/predict/sweep", methods=["POST"])
 @jwt_required()
+def predict_what_if_sweep():
+    """Placement probability and salary over a grid of one or two varied features.
+
+    Body: ``{"base": {<input fields>}, "sweep": [{"feature": "internship_count",
+    "start": 0, "stop": 4, "step": 1}, {"feature": "certification_count",
+    "values": [0, 2, 4]}]}``. Students may omit ``base`` to start from
+    their own profile. Result grids are indexed ``[i]`` or ``[i][j]`` by the
+    position along each sweep axis.
+    """
+    data = request.get_json(silent=True) or {}
+    base = data.get("base")
+    if base is None and get_jwt().get("role") == "student":
+        profile = current_profile()
+        if not profile:
+            return jsonify({"error": "Profile not found"}), 404
+        features = get_features(profile)
+        base = dict(zip(INPUT_FIELDS, (features[c] for c in MODEL_INPUT_COLUMNS)))
+
+    sweep = data.get("sweep")
+    if not isinstance(base, dict) or not isinstance(sweep, list) or not 1 <= len(sweep) <= MAX_SWEEP_AXES:
+        return jsonify({"error": f"base (object) and sweep (1-{MAX_SWEEP_AXES} axes) are required"}), 400
+
+    try:
+        base_values = [float(base.get(field, 0)) for field in INPUT_FIELDS]
+        axes = []
+        for spec in sweep:
+            feature = spec.get("feature")
+            if feature not in INPUT_FIELDS:
+                raise ValueError(f"feature must be one of: {INPUT_FIELDS}")
+            if feature in (a["feature"] for a in axes):
+                raise ValueError(f"{feature} is swept twice")
+            axes.append({"feature": feature, "values": _sweep_values(spec)})
+    except (TypeError, ValueError, KeyError, AttributeError) as e:
+        return jsonify({"error": f"Invalid sweep: {e}"}), 400
+
+    points = 1
+    for axis in axes:
+        points *= len(axis["values"])
+    if points > MAX_SWEEP_POINTS:
+        return jsonify({"error": f"A sweep may have at most {MAX_SWEEP_POINTS} points"}), 400
+
+    grid = predict_sweep(base_values, [(INPUT_FIELDS.index(a["feature"]), a["values"]) for a in axes])
+    return jsonify({
+        "base": dict(zip(INPUT_FIELDS, base_values)),
+        "axes": axes,
+        "probability_placed": grid["probability_placed"],
+        "predicted_salary_lpa": grid["predicted_salary_lpa"],
+        "salary_min": grid["salary_min"],
+        "salary_max": grid["salary_max"],
+    }), 200
+
+
+@ml_bp.route("/predict/my-profile", methods=["GET"])
 @role_required("student")
 def predict_my_profile():
     """Predict placement status and salary for the logged-in student's profile."""
-    user_id = int(get_jwt_identity())
-    profile = StudentProfile.query.filter_by(user_id=user_id).first()
+    profile = current_profile()
     if not profile:
         return jsonify({"error": "Profile not found"}), 404
 
-    # Extract features from profile
-    try:
-        certs = json.loads(profile.certifications) if profile.certifications else []
-    except (json.JSONDecodeError, TypeError):
-        certs = []
-
-    cgpa = profile.cgpa or 0
-    programming_skills = profile.programming_skills_rating or 0
-    soft_skills = profile.soft_skills_rating or 0
-    internship_count = profile.internship_count or 0
-    certification_count = len(certs)
+    features = get_features(profile)
+    cgpa = features["cgpa"]
+    programming_skills = features["programming_skills"]
+    soft_skills = features["soft_skills"]
+    internship_count = features["internship_count"]
+    certification_count = features["certification_count"]
 
     placement_result = predict_placement(cgpa, programming_skills, soft_skills, internship_count, certification_count)
     salary_result = predict_salary(cgpa, programming_skills, soft_skills, internship_count, certification_count)
 
+    if _wants_explanation():
+        explanation = explain_prediction(cgpa, programming_skills, soft_skills, internship_count, certification_count)
+        placement_result["explanation"] = explanation["placement"]
+        salary_result["explanation"] = explanation["salary"]
+
     return jsonify({
         "placement_prediction": placement_result,
         "salary_prediction": salary_result,
@@ -117,8 +217,24 @@ def feature_importance():
     return jsonify({"feature_importances": importances}), 200
 
 
+@ml_bp.route("/explain/cohort", methods=["GET"])
+@role_required("admin", "company")
+def explain_student_cohort():
+    """Average per-feature contributions over verified students, optionally by department.
+
+    Explains every matching student's stored features in one batch.
+    """
+    department = request.args.get("department")
+    ids, X = feature_matrix(verified_only=True, department=department)
+    if not ids:
+        return jsonify({"department": department, "student_count": 0}), 200
+
+    result = explain_cohort(X)
+    result.update({"department": department, "student_count": len(ids)})
+    return jsonify(result), 200
+
+
 @ml_bp.route("/metrics", methods=["GET"])
-@jwt_required()
 @role_required("admin")
 def model_metrics():
     """Return training metrics for both models."""
@@ -126,7 +242,6 @@ def model_metrics():
     return jsonify(metrics), 200
 
 @ml_bp.route("/recommend", methods=["POST"])
-@jwt_required()
 @role_required("company")
 def recommend():
     """Recommend students based on required skills (TF-IDF + Cosine Similarity)."""
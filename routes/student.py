@@ -1,14 +1,17 @@
 import json
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 
 from database import db
 from models.user import User
 from models.student_profile import StudentProfile
 from models.placement import PlacementOpportunity, PlacementRecord
 from services.employability import recalculate_and_save
+from services.ranking_service import METRICS as RANKED_METRICS, get_rank
+from services.upload_store import store_upload
 from utils.decorators import role_required
-from utils.file_handler import validate_and_save_file
+from utils.file_handler import best_photo_variant
+from utils.identity import current_profile
 from config import Config
 
 student_bp = Blueprint("student", __name__, url_prefix="/api/student")
@@ -16,9 +19,7 @@ student_bp = Blueprint("student", __name__, url_prefix="/api/student")
 
 def _get_own_profile():
     """Get the StudentProfile belonging to the current JWT user."""
-    user_id = int(get_jwt_identity())
-    profile = StudentProfile.query.filter_by(user_id=user_id).first()
-    return profile
+    return current_profile()
 
 
 # ──────────────── Profile ────────────────
@@ -85,7 +86,7 @@ def upload_resume():
 
     file = request.files.get("file")
     try:
-        path = validate_and_save_file(file, "resume", Config.UPLOAD_FOLDER)
+        path = store_upload(file, "resume", Config.UPLOAD_FOLDER)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
@@ -104,7 +105,7 @@ def upload_photo():
 
     file = request.files.get("file")
     try:
-        path = validate_and_save_file(file, "photo", Config.UPLOAD_FOLDER)
+        path = store_upload(file, "photo", Config.UPLOAD_FOLDER)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
@@ -123,7 +124,7 @@ def upload_document():
 
     file = request.files.get("file")
     try:
-        path = validate_and_save_file(file, "document", Config.UPLOAD_FOLDER)
+        path = store_upload(file, "document", Config.UPLOAD_FOLDER)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
@@ -241,10 +242,60 @@ def application_flow(record_id):
         "flow": stages
     }), 200
 
+@student_bp.route("/rank", methods=["GET"])
+@role_required("student")
+def my_rank():
+    """Where the student stands by employability and CGPA, in their department and overall.
+
+    The department rank is None while the profile has no department.
+    """
+    profile = _get_own_profile()
+    if not profile:
+        return jsonify({"error": "Profile not found"}), 404
+
+    result = {"department": profile.department}
+    for metric, column in RANKED_METRICS.items():
+        value = getattr(profile, column)
+        result[metric] = {
+            "value": value,
+            # None (not the overall rank) until the student sets a department
+            "department": get_rank(profile.department, metric, value) if profile.department else None,
+            "overall": get_rank(None, metric, value),
+        }
+    return jsonify(result), 200
+
 # ──────────────── Evaluation Graphs ────────────────
 import os
-from flask import send_file
-from utils.graph import generate_cgpa_comparison, generate_employability_graph
+from flask import Response, send_file
+from services.chart_service import ChartRenderBusy, ChartRenderTimeout, chart_key, get_chart
+from services.department_stats import (
+    department_average,
+    department_percentile,
+    department_quantiles,
+    get_department_stats,
+)
+
+def _send_chart(chart_type, value, dept_avg, photo_path):
+    """Serve a cached evaluation chart, answering 304 when the client's copy is current."""
+    value = round(value or 0, 2)
+    dept_avg = round(dept_avg or 0, 2)
+    key = chart_key(chart_type, value, dept_avg, photo_path)
+    if request.if_none_match.contains(key):
+        response = Response(status=304)
+        response.set_etag(key)
+    else:
+        try:
+            path, key = get_chart(chart_type, value, dept_avg, photo_path, key=key)
+        except (ChartRenderBusy, ChartRenderTimeout):
+            response = jsonify({"error": "Chart rendering is busy. Please retry shortly."})
+            response.status_code = 503
+            response.headers["Retry-After"] = "2"
+            return response
+        response = send_file(path, mimetype="image/png", etag=key, conditional=True)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
 
 @student_bp.route("/evaluation/cgpa", methods=["GET"])
 @role_required("student")
@@ -253,19 +304,12 @@ def get_cgpa_graph():
     if not profile:
         return jsonify({"error": "Profile not found"}), 404
     
-    # Calculate dept average CGPA
-    dept_students = StudentProfile.query.filter_by(department=profile.department, is_verified=True).all()
-    if dept_students:
-        dept_avg = sum(s.cgpa for s in dept_students if s.cgpa) / len(dept_students)
-    else:
-        dept_avg = profile.cgpa or 0
+    # Dept average CGPA from the maintained department statistics
+    dept_avg = department_average(profile.department, "cgpa", default=profile.cgpa or 0)
 
-    photo_path = profile.photo_path if profile.photo_path and os.path.exists(profile.photo_path) else None
-    
-    output_filename = os.path.join(Config.UPLOAD_FOLDER, f"cgpa_{profile.user_id}.png")
-    generate_cgpa_comparison(profile.cgpa or 0, dept_avg, photo_path, output_filename)
-    
-    return send_file(output_filename, mimetype='image/png')
+    photo_path = best_photo_variant(profile.photo_path, 200)
+    photo_path = photo_path if photo_path and os.path.exists(photo_path) else None
+    return _send_chart("cgpa", profile.cgpa, dept_avg, photo_path)
 
 @student_bp.route("/evaluation/employability", methods=["GET"])
 @role_required("student")
@@ -274,16 +318,34 @@ def get_employability_graph():
     if not profile:
         return jsonify({"error": "Profile not found"}), 404
 
-    # Calculate dept average employability
-    dept_students = StudentProfile.query.filter_by(department=profile.department, is_verified=True).all()
-    if dept_students:
-        dept_avg = sum(s.employability_score for s in dept_students if s.employability_score) / len(dept_students)
-    else:
-        dept_avg = profile.employability_score or 0
+    # Dept average employability from the maintained department statistics
+    dept_avg = department_average(profile.department, "score", default=profile.employability_score or 0)
 
-    photo_path = profile.photo_path if profile.photo_path and os.path.exists(profile.photo_path) else None
-    
-    output_filename = os.path.join(Config.UPLOAD_FOLDER, f"emp_{profile.user_id}.png")
-    generate_employability_graph(profile.employability_score or 0, dept_avg, photo_path, output_filename)
-    
-    return send_file(output_filename, mimetype='image/png')
+    photo_path = best_photo_variant(profile.photo_path, 200)
+    photo_path = photo_path if photo_path and os.path.exists(photo_path) else None
+    return _send_chart("employability", profile.employability_score, dept_avg, photo_path)
+
+
+@student_bp.route("/evaluation/department", methods=["GET"])
+@role_required("student")
+def get_department_standing():
+    """Department averages, quartiles and the student's percentile for CGPA and score."""
+    profile = _get_own_profile()
+    if not profile:
+        return jsonify({"error": "Profile not found"}), 404
+
+    stats = get_department_stats(profile.department)
+    return jsonify({
+        "department": profile.department,
+        "stats": stats.to_dict() if stats else None,
+        "cgpa": {
+            "value": profile.cgpa,
+            "percentile": department_percentile(profile.department, "cgpa", profile.cgpa),
+            "quartiles": department_quantiles(profile.department, "cgpa"),
+        },
+        "employability": {
+            "value": profile.employability_score,
+            "percentile": department_percentile(profile.department, "score", profile.employability_score),
+            "quartiles": department_quantiles(profile.department, "score"),
+        },
+    }), 200
@@ -161,6 +161,16 @@ def seed():
             imported += 1
 
         print(f"[+] Imported {imported} students, skipped {skipped} (already exist).")
+
+        # The bulk delete above bypasses incremental maintenance
+        from services.department_stats import rebuild_department_stats
+        rebuild_department_stats()
+        print("[+] Rebuilt department statistics.")
+        from services.feature_store import rebuild_feature_store
+        rebuild_feature_store()
+        print("[+] Rebuilt student feature store.")
+        from services.prediction_store import ensure_prediction_store
+        ensure_prediction_store()
         # ── 3. Import default companies ──
         companies = [
             {"name": "Google", "username": "CMP001", "email": "careers@google.com"},
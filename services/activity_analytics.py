@@ -0,0 +1,152 @@
+"""Activity analytics: raw event queries and hourly/daily request counts.
+
+Counts are served from ``activity_rollup``, which the activity log writer
+updates in the same transaction as every batch it inserts, so time-series
+queries never scan ``activity_log``. A row stands for more than one
+request when it is a sampled row (``payload.sample_rate``) or an
+aggregated summary (``payload.count``, ``payload.status_codes``).
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import delete
+
+from database import db
+from models.tracking import ActivityLog, ActivityRollup
+from utils.sql import upsert_increment
+
+INTERVALS = ("hour", "day")
+MAX_EVENTS_PAGE = 500
+
+
+def _bucket_start(ts, interval):
+    if interval == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _weights(log):
+    """Return ``(requests, errors)`` represented by one log row (a dict)."""
+    payload = log.get("payload") if isinstance(log.get("payload"), dict) else {}
+    if payload.get("aggregated"):
+        errors = sum(n for code, n in payload.get("status_codes", {}).items() if int(code) >= 400)
+        return payload.get("count", 0), errors
+
+    weight = 1
+    if payload.get("sample_rate"):
+        weight = max(1, round(1 / payload["sample_rate"]))
+    status = log.get("status_code")
+    return weight, weight if status is not None and status >= 400 else 0
+
+
+def rollup_deltas(logs):
+    """Sum a batch of log rows into {(interval, bucket_start, action_type): [count, errors]}."""
+    deltas = defaultdict(lambda: [0, 0])
+    for log in logs:
+        ts = log.get("timestamp")
+        if ts is None:
+            continue
+        requests, errors = _weights(log)
+        for interval in INTERVALS:
+            delta = deltas[(interval, _bucket_start(ts, interval), log["action_type"])]
+            delta[0] += requests
+            delta[1] += errors
+    return deltas
+
+
+def apply_rollups(logs):
+    """Add a batch of log rows to the rollups within the current session transaction."""
+    deltas = rollup_deltas(logs)
+    if not deltas:
+        return
+    conn = db.session.connection(bind_arguments={"bind": db.engines["activity"]})
+    table = ActivityRollup.__table__
+    for (interval, bucket_start, action_type), (count, errors) in deltas.items():
+        upsert_increment(
+            conn, table,
+            {"interval": interval, "bucket_start": bucket_start, "action_type": action_type},
+            {"count": count, "error_count": errors},
+        )
+
+
+def rebuild_activity_rollups():
+    """Recompute every rollup from the live activity_log table."""
+    db.session.execute(delete(ActivityRollup.__table__))
+    batch = []
+    for log in ActivityLog.query.order_by(ActivityLog.id).yield_per(5000):
+        batch.append({
+            "action_type": log.action_type,
+            "timestamp": log.timestamp,
+            "status_code": log.status_code,
+            "payload": log.payload,
+        })
+        if len(batch) == 5000:
+            apply_rollups(batch)
+            batch = []
+    apply_rollups(batch)
+    db.session.commit()
+
+
+def ensure_activity_rollups():
+    """Build the rollups for databases that have logs but no rollups yet."""
+    if db.session.query(ActivityRollup.interval).first() is None and \
+            db.session.query(ActivityLog.id).first() is not None:
+        rebuild_activity_rollups()
+
+
+def query_events(user_id=None, action_type=None, start=None, end=None, before_id=None, limit=100):
+    """Return ``(events, next_cursor)``, newest first, paginated by id.
+
+    ``next_cursor`` is passed back as ``before_id`` to fetch the next page
+    and is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_EVENTS_PAGE))
+    query = ActivityLog.query
+    if user_id is not None:
+        query = query.filter(ActivityLog.user_id == user_id)
+    if action_type:
+        query = query.filter(ActivityLog.action_type == action_type)
+    if start:
+        query = query.filter(ActivityLog.timestamp >= start)
+    if end:
+        query = query.filter(ActivityLog.timestamp < end)
+    if before_id:
+        query = query.filter(ActivityLog.id < before_id)
+
+    rows = query.order_by(ActivityLog.id.desc()).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [r.to_dict() for r in rows[:limit]], next_cursor
+
+
+def query_counts(interval="hour", start=None, end=None, action_type=None):
+    """Return ``{action_type: [{bucket_start, count, error_count}, ...]}`` from the rollups."""
+    query = ActivityRollup.query.filter(ActivityRollup.interval == interval)
+    if start:
+        query = query.filter(ActivityRollup.bucket_start >= _bucket_start(start, interval))
+    if end:
+        query = query.filter(ActivityRollup.bucket_start < end)
+    if action_type:
+        query = query.filter(ActivityRollup.action_type == action_type)
+
+    series = defaultdict(list)
+    for row in query.order_by(ActivityRollup.action_type, ActivityRollup.bucket_start):
+        series[row.action_type].append({
+            "bucket_start": row.bucket_start.isoformat(),
+            "count": row.count,
+            "error_count": row.error_count,
+        })
+    return dict(series)
+
+
+def parse_time(value):
+    """Parse an optional ISO 8601 query parameter; raises ValueError when malformed.
+
+    Timestamps are stored as naive UTC, so a value with an offset is
+    converted to UTC and returned naive.
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
@@ -0,0 +1,187 @@
+"""Content-addressed cache for the student evaluation charts.
+
+A chart is fully determined by its type, the plotted values, the photo
+drawn on it and the rendering code. The cache key is a hash of exactly
+those inputs; it doubles as the HTTP ETag, and a chart is only rendered
+when its key is not on disk yet. Files are written to a temporary name
+and atomically renamed, so concurrent requests never see partial PNGs.
+
+Rendering happens in a small dedicated process pool so matplotlib never
+runs (or holds the GIL) in request threads. Admission is bounded: when
+every worker is busy and the queue is full, ``ChartRenderBusy`` is raised
+immediately instead of piling up requests.
+"""
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from config import Config
+from utils.graph import init_worker, render_cgpa_comparison, render_employability_graph
+
+# Bump whenever utils/graph.py output changes, to invalidate cached charts.
+CHART_VERSION = 1
+CHART_CACHE_DIR = os.path.join(Config.UPLOAD_FOLDER, "charts")
+CHART_CACHE_MAX_FILES = 5000
+CHART_PRUNE_EVERY = 100  # renders between cache directory scans
+PHOTO_HASH_MEMO_SIZE = 1024
+
+RENDERERS = {
+    "cgpa": render_cgpa_comparison,
+    "employability": render_employability_graph,
+}
+
+
+class ChartRenderBusy(Exception):
+    """All render workers are busy and the render queue is full."""
+
+
+class ChartRenderTimeout(Exception):
+    """A chart did not render within CHART_RENDER_TIMEOUT."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_render_slots = threading.BoundedSemaphore(Config.CHART_RENDER_WORKERS + Config.CHART_RENDER_QUEUE_DEPTH)
+
+_photo_hashes = OrderedDict()  # (path, mtime_ns, size) -> sha256 hex, least recently used first
+_photo_hash_lock = threading.Lock()
+_renders_since_prune = 0
+_prune_lock = threading.Lock()
+
+
+def _photo_digest(photo_path):
+    """SHA-256 of the photo file, memoized (LRU) on path, mtime and size."""
+    if not photo_path:
+        return "none"
+    try:
+        st = os.stat(photo_path)
+    except OSError:
+        return "none"
+
+    memo_key = (photo_path, st.st_mtime_ns, st.st_size)
+    with _photo_hash_lock:
+        digest = _photo_hashes.get(memo_key)
+        if digest:
+            _photo_hashes.move_to_end(memo_key)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    with open(photo_path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    with _photo_hash_lock:
+        _photo_hashes[memo_key] = digest
+        if len(_photo_hashes) > PHOTO_HASH_MEMO_SIZE:
+            _photo_hashes.popitem(last=False)
+    return digest
+
+
+def chart_key(chart_type, value, dept_avg, photo_path=None):
+    """Return the cache key / ETag for a chart with the given inputs."""
+    parts = [
+        chart_type,
+        f"v{CHART_VERSION}",
+        f"{value:.2f}",
+        f"{dept_avg:.2f}",
+        _photo_digest(photo_path),
+    ]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" keeps the workers free of the server's threads, sockets and DB connections.
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.CHART_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_chart(chart_type, value, dept_avg, photo_path=None):
+    """Render a chart in the worker pool and return the PNG bytes.
+
+    Raises ChartRenderBusy when the pool is saturated and ChartRenderTimeout
+    when the render takes longer than CHART_RENDER_TIMEOUT.
+    """
+    if not _render_slots.acquire(blocking=False):
+        raise ChartRenderBusy()
+    try:
+        future = _get_pool().submit(RENDERERS[chart_type], value, dept_avg, photo_path)
+    except Exception:
+        _render_slots.release()
+        raise
+    # The slot is held until the worker is actually done, even if we stop waiting.
+    future.add_done_callback(lambda _: _render_slots.release())
+
+    try:
+        return future.result(timeout=Config.CHART_RENDER_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise ChartRenderTimeout()
+
+
+def _prune_cache():
+    """Drop the oldest cached charts once the cache grows past its limit.
+
+    The directory is only scanned every CHART_PRUNE_EVERY renders.
+    """
+    global _renders_since_prune
+    with _prune_lock:
+        _renders_since_prune += 1
+        if _renders_since_prune < CHART_PRUNE_EVERY:
+            return
+        _renders_since_prune = 0
+    try:
+        entries = [e for e in os.scandir(CHART_CACHE_DIR) if e.name.endswith(".png")]
+    except OSError:
+        return
+    if len(entries) <= CHART_CACHE_MAX_FILES:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[: len(entries) - int(CHART_CACHE_MAX_FILES * 0.9)]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def get_chart(chart_type, value, dept_avg, photo_path=None, key=None):
+    """Return ``(path, key)`` of the cached PNG, rendering it on a key miss."""
+    value = round(value or 0, 2)
+    dept_avg = round(dept_avg or 0, 2)
+    key = key or chart_key(chart_type, value, dept_avg, photo_path)
+    path = os.path.join(CHART_CACHE_DIR, f"{key}.png")
+    if os.path.exists(path):
+        return path, key
+
+    png = render_chart(chart_type, value, dept_avg, photo_path)
+
+    os.makedirs(CHART_CACHE_DIR, exist_ok=True)
+    tmp_path = os.path.join(CHART_CACHE_DIR, f".{key}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    _prune_cache()
+    return path, key
@@ -0,0 +1,223 @@
+"""Incrementally maintained per-department statistics.
+
+Every flush that inserts, updates or deletes a StudentProfile applies the
+change in that profile's contribution (department, verified, CGPA, score)
+to ``department_stats`` and ``department_stat_bins`` in the same
+transaction. Department means and percentiles are then O(1) lookups instead
+of a scan over the whole department.
+
+Only verified profiles are counted, matching what students are compared
+against on the evaluation page.
+"""
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from database import db
+from models.department_stats import DepartmentStats, DepartmentStatBin
+from models.student_profile import StudentProfile
+from utils.sql import upsert_increment
+
+TRACKED_FIELDS = ("department", "is_verified", "cgpa", "employability_score")
+
+# metric -> (profile attribute, bin width, highest bin index)
+METRICS = {
+    "cgpa": ("cgpa", 0.1, 100),
+    "score": ("employability_score", 1.0, 100),
+}
+
+
+def _bin_index(metric, value):
+    _, width, top = METRICS[metric]
+    return max(0, min(top, int(round(value / width))))
+
+
+def _bin_value(metric, index):
+    return index * METRICS[metric][1]
+
+
+# ─── Change capture ───
+
+def _load_old_value_on_set(target, value, oldvalue, initiator):
+    pass
+
+
+# Make sure the previous value is loaded (and kept in history) even when a
+# tracked attribute is assigned on an expired instance.
+for _field in TRACKED_FIELDS:
+    event.listen(getattr(StudentProfile, _field), "set", _load_old_value_on_set, active_history=True)
+
+
+def _current_value(obj, field, pending):
+    value = getattr(obj, field)
+    if value is None and pending:
+        # Column defaults are only applied at INSERT time.
+        default = StudentProfile.__table__.c[field].default
+        if default is not None and default.is_scalar:
+            value = default.arg
+    return value
+
+
+def _previous_value(state, field):
+    history = state.attrs[field].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return state.attrs[field].value
+
+
+def _contribution(department, is_verified, cgpa, score):
+    if not is_verified:
+        return None
+    return (department or "", cgpa, score)
+
+
+def _accumulate(deltas, contribution, sign):
+    if contribution is None:
+        return
+    dept, cgpa, score = contribution
+    totals = deltas["stats"].setdefault(dept, {
+        "student_count": 0, "cgpa_count": 0, "cgpa_sum": 0.0, "score_count": 0, "score_sum": 0.0,
+    })
+    totals["student_count"] += sign
+    for metric, value in (("cgpa", cgpa), ("score", score)):
+        if value is None:
+            continue
+        totals[f"{metric}_count"] += sign
+        totals[f"{metric}_sum"] += sign * value
+        key = (dept, metric, _bin_index(metric, value))
+        deltas["bins"][key] = deltas["bins"].get(key, 0) + sign
+
+
+@event.listens_for(Session, "before_flush")
+def _apply_profile_deltas(session, flush_context, instances):
+    deltas = {"stats": {}, "bins": {}}
+
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, StudentProfile):
+                new = _contribution(*(_current_value(obj, f, True) for f in TRACKED_FIELDS))
+                _accumulate(deltas, new, +1)
+
+        for obj in session.deleted:
+            if isinstance(obj, StudentProfile):
+                state = inspect(obj)
+                old = _contribution(*(_previous_value(state, f) for f in TRACKED_FIELDS))
+                _accumulate(deltas, old, -1)
+
+        for obj in session.dirty:
+            if not isinstance(obj, StudentProfile) or not session.is_modified(obj):
+                continue
+            state = inspect(obj)
+            old = _contribution(*(_previous_value(state, f) for f in TRACKED_FIELDS))
+            new = _contribution(*(_current_value(obj, f, False) for f in TRACKED_FIELDS))
+            if old != new:
+                _accumulate(deltas, old, -1)
+                _accumulate(deltas, new, +1)
+
+    if not deltas["stats"]:
+        return
+
+    conn = session.connection()
+    now = datetime.utcnow()
+    for dept, totals in deltas["stats"].items():
+        upsert_increment(conn, DepartmentStats.__table__, {"department": dept}, totals, {"updated_at": now})
+    for (dept, metric, index), count in deltas["bins"].items():
+        if count:
+            upsert_increment(conn, DepartmentStatBin.__table__,
+                             {"department": dept, "metric": metric, "bin": index}, {"count": count})
+
+
+# ─── Lookups ───
+
+def get_department_stats(department):
+    """Return the DepartmentStats row for a department, or None."""
+    return db.session.get(DepartmentStats, department or "")
+
+
+def department_average(department, metric, default=0):
+    """Mean of ``metric`` ("cgpa" or "score") over verified students of a department."""
+    stats = get_department_stats(department)
+    mean = None
+    if stats:
+        mean = stats.cgpa_mean if metric == "cgpa" else stats.score_mean
+    return default if mean is None else mean
+
+
+def _histogram(department, metric):
+    return (
+        db.session.query(DepartmentStatBin.bin, DepartmentStatBin.count)
+        .filter_by(department=department or "", metric=metric)
+        .filter(DepartmentStatBin.count > 0)
+        .order_by(DepartmentStatBin.bin)
+        .all()
+    )
+
+
+def department_percentile(department, metric, value):
+    """Percentile rank (0-100) of ``value`` within the department, from the sketch."""
+    bins = _histogram(department, metric)
+    total = sum(count for _, count in bins)
+    if not total or value is None:
+        return None
+    target = _bin_index(metric, value)
+    below = sum(count for index, count in bins if index < target)
+    same = sum(count for index, count in bins if index == target)
+    return round((below + 0.5 * same) / total * 100, 1)
+
+
+def department_quantiles(department, metric, quantiles=(0.25, 0.5, 0.75)):
+    """Approximate quantiles of ``metric`` within the department, from the sketch."""
+    bins = _histogram(department, metric)
+    total = sum(count for _, count in bins)
+    if not total:
+        return {}
+    result = {}
+    for q in quantiles:
+        threshold = q * total
+        running = 0
+        for index, count in bins:
+            running += count
+            if running >= threshold:
+                result[f"p{int(q * 100)}"] = round(_bin_value(metric, index), 2)
+                break
+    return result
+
+
+# ─── Rebuild ───
+
+def rebuild_department_stats():
+    """Recompute both tables from scratch.
+
+    Needed after bulk UPDATE/DELETE statements that bypass the ORM flush, and
+    to populate the tables for an existing database.
+    """
+    deltas = {"stats": {}, "bins": {}}
+    rows = (
+        db.session.query(StudentProfile.department, StudentProfile.cgpa, StudentProfile.employability_score)
+        .filter(StudentProfile.is_verified == True)
+        .yield_per(1000)
+    )
+    for dept, cgpa, score in rows:
+        _accumulate(deltas, (dept or "", cgpa, score), +1)
+
+    now = datetime.utcnow()
+    db.session.query(DepartmentStatBin).delete()
+    db.session.query(DepartmentStats).delete()
+    db.session.bulk_insert_mappings(DepartmentStats, [
+        dict(totals, department=dept, updated_at=now) for dept, totals in deltas["stats"].items()
+    ])
+    db.session.bulk_insert_mappings(DepartmentStatBin, [
+        {"department": dept, "metric": metric, "bin": index, "count": count}
+        for (dept, metric, index), count in deltas["bins"].items()
+    ])
+    db.session.commit()
+
+
+def ensure_department_stats():
+    """Populate the statistics tables on first run against an existing database."""
+    if DepartmentStats.query.first() is None and StudentProfile.query.filter_by(is_verified=True).first():
+        rebuild_department_stats()
+        print("[DB] Built department statistics.")
@@ -1,4 +1,8 @@
-import json
+import time
+
+import numpy as np
+
+RECALC_CHUNK_SIZE = 5000
 
 
 def calculate_employability_score(profile):
@@ -10,27 +14,21 @@ def calculate_employability_score(profile):
         Certifications → 25%
         Projects       → 20%
     """
+    from services.feature_store import compute_features
+
+    features = compute_features(profile)
+
     # CGPA component (0-30)
-    cgpa = profile.cgpa or 0
-    cgpa_score = (min(cgpa, 10) / 10) * 30
+    cgpa_score = (min(features["cgpa"], 10) / 10) * 30
 
     # Internship component (0-25), caps at 3
-    internship_count = profile.internship_count or 0
-    internship_score = min(internship_count / 3, 1.0) * 25
+    internship_score = min(features["internship_count"] / 3, 1.0) * 25
 
     # Certifications component (0-25), caps at 5
-    try:
-        certs = json.loads(profile.certifications) if profile.certifications else []
-    except (json.JSONDecodeError, TypeError):
-        certs = []
-    cert_score = min(len(certs) / 5, 1.0) * 25
+    cert_score = min(features["certification_count"] / 5, 1.0) * 25
 
     # Projects component (0-20), caps at 4
-    try:
-        projects = json.loads(profile.projects) if profile.projects else []
-    except (json.JSONDecodeError, TypeError):
-        projects = []
-    project_score = min(len(projects) / 4, 1.0) * 20
+    project_score = min(features["project_count"] / 4, 1.0) * 20
 
     total = cgpa_score + internship_score + cert_score + project_score
     return round(total, 2)
@@ -40,3 +38,81 @@ def recalculate_and_save(profile, db):
     """Recalculate the employability score and persist it."""
     profile.employability_score = calculate_employability_score(profile)
     db.session.add(profile)
+
+
+def _vectorized_scores(cgpa, internships, certs, projects):
+    """Same weights as calculate_employability_score, over whole columns at once."""
+    cgpa_score = np.minimum(cgpa, 10) / 10 * 30
+    internship_score = np.minimum(internships / 3, 1.0) * 25
+    cert_score = np.minimum(certs / 5, 1.0) * 25
+    project_score = np.minimum(projects / 4, 1.0) * 20
+    return np.round(cgpa_score + internship_score + cert_score + project_score, 2)
+
+
+def bulk_recalculate_scores(db, chunk_size=RECALC_CHUNK_SIZE):
+    """Recalculate every student's employability score in bulk.
+
+    Reads the typed scoring columns from the feature store in id-ordered
+    chunks, scores each chunk with
+    NumPy and writes back only the rows whose score changed. Profiles that
+    have no feature row yet are scored from features computed on the fly.
+    Returns processed/updated counts and throughput.
+    """
+    from models.student_features import StudentFeatures
+    from models.student_profile import StudentProfile
+    from services.department_stats import rebuild_department_stats
+    from services.feature_store import compute_features
+    from services.profile_events import mark_profiles_changed
+
+    columns = ("cgpa", "internship_count", "certification_count", "project_count")
+    started = time.perf_counter()
+    processed = updated = computed = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(StudentProfile.id, StudentProfile.employability_score, StudentFeatures.profile_id,
+                             *(getattr(StudentFeatures, c) for c in columns))
+            .outerjoin(StudentFeatures, StudentFeatures.profile_id == StudentProfile.id)
+            .filter(StudentProfile.id > last_id)
+            .order_by(StudentProfile.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            break
+        ids = [r[0] for r in rows]
+        old = [r[1] for r in rows]
+        features = [r[3:] for r in rows]
+        missing = {r[0]: i for i, r in enumerate(rows) if r[2] is None}
+        if missing:
+            for profile in StudentProfile.query.filter(StudentProfile.id.in_(list(missing))):
+                values = compute_features(profile)
+                features[missing[profile.id]] = tuple(values[c] for c in columns)
+            computed += len(missing)
+        new = _vectorized_scores(*np.array(features, dtype=float).T)
+        old = np.array(old, dtype=float)
+        changed = np.flatnonzero(np.isnan(old) | (np.abs(new - old) > 1e-9))
+
+        if changed.size:
+            db.session.bulk_update_mappings(StudentProfile, [
+                {"id": ids[i], "employability_score": float(new[i])} for i in changed
+            ])
+            db.session.commit()
+
+        processed += len(rows)
+        updated += int(changed.size)
+        last_id = ids[-1]
+
+    if updated:
+        # bulk_update_mappings bypasses the ORM hooks that keep these current
+        rebuild_department_stats()
+        mark_profiles_changed()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "processed": processed,
+        "updated": updated,
+        "features_computed": computed,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(processed / elapsed, 1) if elapsed > 0 else None,
+    }
@@ -0,0 +1,150 @@
+"""Materialized per-student model features.
+
+``compute_features`` is the single definition of the features derived
+from a StudentProfile (list lengths of the JSON columns, skill ratings,
+the recommendation text). Every flush that inserts, deletes or changes a
+feature-relevant column of a profile upserts its ``student_features`` row
+in the same transaction, so readers (employability scoring, predictions,
+recommendations) get typed columns and never parse JSON text. The same
+flush marks the profile's stored prediction dirty (see
+``services.prediction_store``).
+"""
+import json
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import delete, event, exists, inspect, update
+from sqlalchemy.orm import Session
+
+from database import db
+from models.student_features import StudentFeatures
+from models.student_prediction import StudentPrediction
+from models.student_profile import StudentProfile
+from utils.sql import upsert, upsert_increment
+
+SOURCE_FIELDS = (
+    "cgpa", "programming_skills_rating", "soft_skills_rating", "internship_count",
+    "certifications", "projects", "skills",
+)
+# Model input vector, in services.ml_service.FEATURE_NAMES order
+MODEL_INPUT_COLUMNS = ("cgpa", "programming_skills", "soft_skills", "internship_count", "certification_count")
+
+
+def _json_list(value):
+    try:
+        items = json.loads(value) if value else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return items if isinstance(items, list) else []
+
+
+def compute_features(profile):
+    """Derive the feature values of a StudentProfile (persisted or not)."""
+    certs = _json_list(profile.certifications)
+    projects = _json_list(profile.projects)
+    skills = _json_list(profile.skills)
+    return {
+        "cgpa": profile.cgpa or 0.0,
+        "programming_skills": profile.programming_skills_rating or 0,
+        "soft_skills": profile.soft_skills_rating or 0,
+        "internship_count": profile.internship_count or 0,
+        "certification_count": len(certs),
+        "project_count": len(projects),
+        "skill_count": len(skills),
+        "document": " ".join(str(s) for s in skills + projects),
+    }
+
+
+def _features_changed(obj):
+    state = inspect(obj)
+    return any(state.attrs[f].history.has_changes() for f in SOURCE_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_features(session, flush_context):
+    upserts = []
+    deleted = []
+    for obj in session.new:
+        if isinstance(obj, StudentProfile):
+            upserts.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, StudentProfile) and _features_changed(obj):
+            upserts.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, StudentProfile):
+            deleted.append(obj.id)
+    if not upserts and not deleted:
+        return
+
+    conn = session.connection()
+    table = StudentFeatures.__table__
+    predictions = StudentPrediction.__table__
+    now = datetime.utcnow()
+    for obj in upserts:
+        upsert(conn, table, {"profile_id": obj.id}, dict(compute_features(obj), updated_at=now))
+        upsert_increment(conn, predictions, {"profile_id": obj.id}, {"revision": 1}, extra={"dirty": True})
+    if deleted:
+        conn.execute(delete(table).where(table.c.profile_id.in_(deleted)))
+        conn.execute(delete(predictions).where(predictions.c.profile_id.in_(deleted)))
+    if upserts:
+        session.info["predictions_dirty"] = True
+
+
+def get_features(profile):
+    """The stored features of a profile, computed on the fly if the row is missing."""
+    row = db.session.get(StudentFeatures, profile.id) if profile.id else None
+    if row is not None:
+        return row.to_dict()
+    return compute_features(profile)
+
+
+def feature_matrix(profile_ids=None, verified_only=False, department=None):
+    """Return ``(profile_ids, X)`` where X is the (N, 5) float model input matrix.
+
+    ``department`` matches profiles whose department contains it (case-insensitive).
+    """
+    columns = [getattr(StudentFeatures, c) for c in MODEL_INPUT_COLUMNS]
+    query = db.session.query(StudentFeatures.profile_id, *columns)
+    if verified_only or department:
+        query = query.join(StudentProfile, StudentProfile.id == StudentFeatures.profile_id)
+    if verified_only:
+        query = query.filter(StudentProfile.is_verified == True)
+    if department:
+        query = query.filter(StudentProfile.department.ilike(f"%{department}%"))
+    if profile_ids is not None:
+        query = query.filter(StudentFeatures.profile_id.in_(list(profile_ids)))
+    rows = query.order_by(StudentFeatures.profile_id).all()
+    if not rows:
+        return [], np.empty((0, len(MODEL_INPUT_COLUMNS)))
+    ids = [r[0] for r in rows]
+    return ids, np.array([r[1:] for r in rows], dtype=float)
+
+
+def rebuild_feature_store():
+    """Recompute every feature row. Needed after bulk writes that bypass the ORM flush."""
+    now = datetime.utcnow()
+    db.session.execute(delete(StudentFeatures.__table__))
+    batch = []
+    for profile in StudentProfile.query.order_by(StudentProfile.id).yield_per(1000):
+        batch.append(dict(compute_features(profile), profile_id=profile.id, updated_at=now))
+        if len(batch) == 1000:
+            db.session.bulk_insert_mappings(StudentFeatures, batch)
+            batch = []
+    if batch:
+        db.session.bulk_insert_mappings(StudentFeatures, batch)
+    table = StudentPrediction.__table__
+    db.session.execute(update(table).values(revision=table.c.revision + 1, dirty=True))
+    db.session.commit()
+
+
+def ensure_feature_store():
+    """Rebuild the feature store when a profile has no feature row (e.g. first run) or a row has no profile."""
+    missing = db.session.query(exists().where(
+        ~exists().where(StudentFeatures.profile_id == StudentProfile.id)
+    ).select_from(StudentProfile)).scalar()
+    orphaned = db.session.query(exists().where(
+        ~exists().where(StudentProfile.id == StudentFeatures.profile_id)
+    ).select_from(StudentFeatures)).scalar()
+    if missing or orphaned:
+        rebuild_feature_store()
+        print("[DB] Built student feature store.")
@@ -0,0 +1,201 @@
+"""Retention and archival for the activity log.
+
+ActivityLog lives in its own database (the "activity" bind). Rows older
+than ``ACTIVITY_LOG_RETENTION_DAYS`` are moved, one calendar month per
+file, into gzip-compressed NDJSON archives:
+
+    <ACTIVITY_LOG_ARCHIVE_FOLDER>/activity_log-YYYY-MM.ndjson.gz
+
+Each run appends a new gzip member to the month's file, which readers
+treat as one continuous stream. Rows are written to the archive before
+they are deleted, so an interrupted run can only duplicate rows, never
+lose them; the reader skips duplicate ids.
+"""
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, inspect, insert, select, text
+
+from database import db
+from models.tracking import ActivityLog
+
+ARCHIVE_BATCH_SIZE = 5000
+RETENTION_INTERVAL = 24 * 3600  # seconds between scheduled runs
+RETENTION_MAX_ROWS = 100000  # rows archived per scheduled run
+RETENTION_BACKLOG_PAUSE = 60  # seconds before the next run when a run left a backlog
+VACUUM_PAGES = 1000  # pages handed back per run on incremental auto_vacuum databases
+ARCHIVE_NAME = re.compile(r"^activity_log-(\d{4})-(\d{2})\.ndjson\.gz$")
+
+
+def _archive_path(folder, month):
+    return os.path.join(folder, f"activity_log-{month}.ndjson.gz")
+
+
+def _append_to_archive(path, records):
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as f:
+            for record in records:
+                f.write(json.dumps(record).encode())
+                f.write(b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_old_activity_logs(retention_days, archive_folder, batch_size=ARCHIVE_BATCH_SIZE, max_rows=None):
+    """Move activity logs older than ``retention_days`` into monthly archives.
+
+    Stops after about ``max_rows`` rows when given. Returns the number of
+    rows archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    table = ActivityLog.__table__
+    os.makedirs(archive_folder, exist_ok=True)
+
+    archived = 0
+    while max_rows is None or archived < max_rows:
+        rows = (
+            ActivityLog.query
+            .filter(ActivityLog.timestamp < cutoff)
+            .order_by(ActivityLog.id)
+            .limit(batch_size if max_rows is None else min(batch_size, max_rows - archived))
+            .all()
+        )
+        if not rows:
+            break
+
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row.timestamp.strftime("%Y-%m"), []).append(row.to_dict())
+        for month, records in by_month.items():
+            _append_to_archive(_archive_path(archive_folder, month), records)
+
+        db.session.execute(delete(table).where(table.c.id.in_([r.id for r in rows])))
+        db.session.commit()
+        archived += len(rows)
+
+    if archived and db.engines["activity"].dialect.name == "sqlite":
+        # New rows reuse the freed pages. A full VACUUM would lock the database
+        # for the log writer, so pages are only handed back a bounded number at
+        # a time, on databases set up with auto_vacuum=INCREMENTAL.
+        with db.engines["activity"].begin() as conn:
+            if conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+                conn.execute(text(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")).fetchall()
+    return archived
+
+
+def _archive_months(archive_folder):
+    try:
+        names = sorted(os.listdir(archive_folder))
+    except OSError:
+        return []
+    months = []
+    for name in names:
+        match = ARCHIVE_NAME.match(name)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2)), os.path.join(archive_folder, name)))
+    return months
+
+
+def read_archived_logs(archive_folder, start=None, end=None, action_type=None, user_id=None):
+    """Yield archived log records (dicts) with ``start <= timestamp < end``."""
+    for year, month, path in _archive_months(archive_folder):
+        month_start = datetime(year, month, 1)
+        month_end = datetime(year + month // 12, month % 12 + 1, 1)
+        if (start and month_end <= start) or (end and month_start >= end):
+            continue
+
+        seen = set()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["id"] in seen:
+                    continue
+                seen.add(record["id"])
+                if action_type and record["action_type"] != action_type:
+                    continue
+                if user_id is not None and record["user_id"] != user_id:
+                    continue
+                ts = datetime.fromisoformat(record["timestamp"]) if record["timestamp"] else None
+                if ts is None or (start and ts < start) or (end and ts >= end):
+                    continue
+                yield record
+
+
+def iter_activity_logs(archive_folder, start=None, end=None, action_type=None, user_id=None):
+    """Yield activity logs from the archives followed by the live table, oldest first."""
+    yield from read_archived_logs(archive_folder, start, end, action_type, user_id)
+
+    query = ActivityLog.query
+    if start:
+        query = query.filter(ActivityLog.timestamp >= start)
+    if end:
+        query = query.filter(ActivityLog.timestamp < end)
+    if action_type:
+        query = query.filter(ActivityLog.action_type == action_type)
+    if user_id is not None:
+        query = query.filter(ActivityLog.user_id == user_id)
+    for row in query.order_by(ActivityLog.timestamp, ActivityLog.id).yield_per(1000):
+        yield row.to_dict()
+
+
+def migrate_legacy_activity_log():
+    """Copy rows from an activity_log table in the main database into the activity bind.
+
+    Databases created before the split kept the log next to the transactional
+    tables. The old table is renamed afterwards so the copy only happens once.
+    """
+    main_engine, log_engine = db.engine, db.engines["activity"]
+    if main_engine.url == log_engine.url or not inspect(main_engine).has_table("activity_log"):
+        return 0
+
+    legacy = ActivityLog.__table__.to_metadata(db.MetaData())
+    copied = 0
+    with main_engine.connect() as src, log_engine.begin() as dst:
+        last_id = 0
+        while True:
+            rows = src.execute(
+                select(legacy).where(legacy.c.id > last_id).order_by(legacy.c.id).limit(ARCHIVE_BATCH_SIZE)
+            ).mappings().all()
+            if not rows:
+                break
+            dst.execute(insert(ActivityLog.__table__).prefix_with("OR IGNORE", dialect="sqlite"),
+                        [dict(r) for r in rows])
+            last_id = rows[-1]["id"]
+            copied += len(rows)
+    with main_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE activity_log RENAME TO activity_log_legacy"))
+    return copied
+
+
+def _run_retention(app, retention_days):
+    while True:
+        archived = 0
+        with app.app_context():
+            try:
+                archived = archive_old_activity_logs(retention_days, app.config["ACTIVITY_LOG_ARCHIVE_FOLDER"],
+                                                     max_rows=RETENTION_MAX_ROWS)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[Logging Service Error] Activity log retention failed: {e}")
+        if archived:
+            print(f"[Logging Service] Archived {archived} activity logs older than {retention_days} days")
+        # A run that hit the row limit left older rows behind; continue with them soon
+        time.sleep(RETENTION_BACKLOG_PAUSE if archived >= RETENTION_MAX_ROWS else RETENTION_INTERVAL)
+
+
+def schedule_log_retention(app):
+    """Run the retention job at startup and then about once a day, on its own thread.
+
+    Each run archives at most RETENTION_MAX_ROWS rows, so a large backlog is
+    worked off in slices instead of one long transaction.
+    """
+    retention_days = app.config.get("ACTIVITY_LOG_RETENTION_DAYS", 0)
+    if retention_days <= 0:
+        return
+    threading.Thread(target=_run_retention, args=(app, retention_days),
+                     name="activity-log-retention", daemon=True).start()
@@ -1,125 +1,525 @@
+import atexit
 import json
+import os
+import queue
+import random
+import threading
+import time
 import traceback
+from collections import deque
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
-from flask import request
+from flask import g, request
+from flask_jwt_extended import get_jwt_identity
 
-# Global thread pool for non-blocking DB writes
-_log_executor = ThreadPoolExecutor(max_workers=2)
 
-def _save_log_to_db(app, log_data):
+class ActivityLogWriter:
     """
-    Background worker function that runs inside the Flask app context.
+    Buffers activity log entries (and student login records) in a bounded queue
+    and writes them with bulk inserts from a single background thread.
+
+    A batch is flushed once it holds ``batch_size`` entries or ``flush_interval``
+    seconds after its first entry arrived. When the queue is full new entries are
+    dropped; with the "sample" overflow policy only a ``sample_rate`` fraction of
+    entries is admitted once the queue is three quarters full, which keeps a
+    representative trickle flowing instead of a hard cut-off.
+
+    When a batch insert fails its rows are retried one at a time with the
+    next flushes, so a row that can never be written only holds back itself.
+    A row is given up after MAX_FLUSH_ATTEMPTS failed inserts, or at once
+    while MAX_RETRY_ROWS rows are already waiting.
+
+    Login records are never sampled out or dropped: the last LOGIN_RESERVE_RATIO
+    of the queue only admits logins, a login that still finds the queue full
+    waits up to LOGIN_ENQUEUE_TIMEOUT and is then inserted synchronously (and
+    handed to the writer's retries if that fails), and a login that is given
+    up is appended to ``spill_path`` instead.
     """
-    with app.app_context():
+
+    HIGH_WATER_RATIO = 0.75
+    LOGIN_RESERVE_RATIO = 0.05
+    LOGIN_ENQUEUE_TIMEOUT = 0.05  # seconds
+    MAX_FLUSH_ATTEMPTS = 3
+    MAX_RETRY_ROWS = 1000
+
+    def __init__(self, app, batch_size=200, flush_interval=0.5, max_queue=10000,
+                 overflow_policy="drop", sample_rate=0.1, spill_path=None):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._high_water = int(max_queue * self.HIGH_WATER_RATIO)
+        self._activity_limit = max_queue - max(1, int(max_queue * self.LOGIN_RESERVE_RATIO))
+        self._retry = []  # (kind, data, attempts) of failed inserts; only touched by the writer thread
+        self._handoff = deque()  # failed synchronous inserts from request threads, moved into _retry
+        self._stop = threading.Event()
+        self._thread = None
+        self._periodic = []
+        self._counter_lock = threading.Lock()
+        # policy_skipped counts requests the middleware did not log because of a sampling policy
+        self._counters = {"enqueued": 0, "flushed": 0, "dropped": 0, "sampled_out": 0, "failed": 0,
+                          "retried": 0, "written_sync": 0, "spilled": 0, "batches": 0, "policy_skipped": 0}
+
+    def _count(self, name, n=1):
+        with self._counter_lock:
+            self._counters[name] += n
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, log_data, kind="activity"):
+        """
+        Queue an entry. ``kind`` is "activity" (an ActivityLog row) or
+        "student_login" (a StudentLoginLog row). Activity entries never block and
+        False is returned when one was dropped or sampled out; logins are always
+        recorded (see the class docstring).
+        """
+        if kind == "student_login":
+            try:
+                self._queue.put((kind, log_data), timeout=self.LOGIN_ENQUEUE_TIMEOUT)
+            except queue.Full:
+                self._insert_now(log_data)
+                return True
+            self._count("enqueued")
+            return True
+
+        if (self.overflow_policy == "sample" and self._queue.qsize() >= self._high_water
+                and random.random() >= self.sample_rate):
+            self._count("sampled_out")
+            return False
+        if self._queue.qsize() >= self._activity_limit:
+            self._count("dropped")
+            return False
+        try:
+            self._queue.put_nowait((kind, log_data))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    def _insert_now(self, log_data):
+        """Write one login record on the caller's thread, in its own transaction.
+
+        On failure the record is handed to the writer thread, which retries it.
+        """
+        from sqlalchemy import insert
+        from database import db
+        from models.tracking import StudentLoginLog
+
+        try:
+            with self.app.app_context(), db.engine.begin() as conn:
+                conn.execute(insert(StudentLoginLog.__table__), [log_data])
+            self._count("written_sync")
+        except Exception as e:
+            self._handoff.append(("student_login", log_data, 1))
+            self._count("retried")
+            print(f"[Logging Service Error] Could not save student login log, will retry: {e}")
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            # On shutdown, take whatever is already queued without waiting for more
+            remaining = 0 if self._stop.is_set() else deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def add_periodic(self, func):
+        """Run ``func`` on the writer thread roughly every ``flush_interval`` seconds."""
+        self._periodic.append(func)
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch or self._retry or self._handoff:
+                self._write(batch)
+            for func in self._periodic:
+                try:
+                    func()
+                except Exception as e:
+                    print(f"[Logging Service Error] Periodic task failed: {e}")
+        if self._retry or self._handoff:
+            # Last attempt on shutdown; whatever still fails is given up
+            self._write([])
+            retry, self._retry = self._retry, []
+            for kind, data, _ in retry:
+                self._give_up(kind, data)
+
+    def _targets(self):
+        from models.tracking import ActivityLog, StudentLoginLog
+        from services.activity_analytics import apply_rollups
+
+        # The tables live in different databases, so each gets its own transaction
+        return {
+            "activity": (ActivityLog, "activity logs", apply_rollups),
+            "student_login": (StudentLoginLog, "student login logs", None),
+        }
+
+    def _write(self, batch):
+        targets = self._targets()
+        while self._handoff:
+            self._retry.append(self._handoff.popleft())
+        retry, self._retry = self._retry, []
+        with self.app.app_context():
+            for kind, (model, label, after) in targets.items():
+                rows = [data for k, data in batch if k == kind]
+                if rows and not self._insert(model, rows, label, after=after):
+                    for data in rows:
+                        self._requeue(kind, data, 1)
+            for kind, data, attempts in retry:
+                model, label, after = targets[kind]
+                if not self._insert(model, [data], label, after=after):
+                    self._requeue(kind, data, attempts + 1)
+        self._count("batches")
+
+    def _requeue(self, kind, data, attempts):
+        if attempts >= self.MAX_FLUSH_ATTEMPTS or len(self._retry) >= self.MAX_RETRY_ROWS:
+            self._give_up(kind, data)
+        else:
+            self._retry.append((kind, data, attempts))
+            self._count("retried")
+
+    def _give_up(self, kind, data):
+        """Count an activity row as failed; append a login record to the spill file."""
+        if kind == "student_login" and self.spill_path:
+            try:
+                os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(data, default=str) + "\n")
+                self._count("spilled")
+                return
+            except OSError as e:
+                print(f"[Logging Service Error] Could not spill student login log: {e}")
+        self._count("failed")
+        print(f"[Logging Service Error] Gave up on {kind} record: {data}")
+
+    def _insert(self, model, rows, label, after=None):
+        """Insert ``rows`` in one transaction; returns False (after rolling back) on failure."""
+        from sqlalchemy import insert
+        from database import db
+
         try:
-            from database import db
-            from models.tracking import ActivityLog
-            
-            log_entry = ActivityLog(**log_data)
-            db.session.add(log_entry)
+            db.session.execute(insert(model.__table__), rows)
+            if after:
+                after(rows)
             db.session.commit()
+            self._count("flushed", len(rows))
+            return True
         except Exception as e:
-            # Fallback to standard error output if DB insert fails asynchronously
-            print(f"[Logging Service Error] Could not save activity log: {e}")
+            db.session.rollback()
+            print(f"[Logging Service Error] Could not save {len(rows)} {label}, will retry: {e}")
             print(traceback.format_exc())
+            return False
+
+    def stop(self, timeout=5.0):
+        """Flush everything still queued and stop the writer thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        with self._counter_lock:
+            counters = dict(self._counters)
+        counters["queued"] = self._queue.qsize()
+        return counters
+
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class ActivityAggregator:
+    """
+    Folds requests into per-window counters instead of one log row each.
+
+    A window is keyed by action type, URL rule, method and start time. Once it
+    has closed it becomes a single summary ActivityLog row whose payload holds
+    the request count plus status-code and latency histograms.
+    """
+
+    def __init__(self, window_seconds=60):
+        self.window_seconds = window_seconds
+        self._windows = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.summaries = 0
+
+    def record(self, action_type, endpoint, method, status_code, latency_ms, now=None):
+        now = time.time() if now is None else now
+        start = int(now // self.window_seconds * self.window_seconds)
+        key = (action_type, endpoint, method, start)
+        bucket = next((str(b) for b in LATENCY_BUCKETS_MS if latency_ms <= b), "inf")
+
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = {
+                    "count": 0, "status_codes": {}, "latency_buckets": {},
+                    "latency_sum_ms": 0.0, "latency_max_ms": 0.0,
+                }
+            window["count"] += 1
+            codes = window["status_codes"]
+            codes[str(status_code)] = codes.get(str(status_code), 0) + 1
+            buckets = window["latency_buckets"]
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+            window["latency_sum_ms"] += latency_ms
+            window["latency_max_ms"] = max(window["latency_max_ms"], latency_ms)
+            self.recorded += 1
+
+    def pop_closed(self, now=None, force=False):
+        """Remove closed windows (every window when ``force``) and return their summary rows."""
+        now = time.time() if now is None else now
+        with self._lock:
+            closed = [k for k in self._windows if force or k[3] + self.window_seconds <= now]
+            windows = [(k, self._windows.pop(k)) for k in closed]
+            self.summaries += len(windows)
+        return [self._summary(k, w) for k, w in windows]
+
+    def _summary(self, key, window):
+        action_type, endpoint, method, start = key
+        window["latency_sum_ms"] = round(window["latency_sum_ms"], 3)
+        window["latency_max_ms"] = round(window["latency_max_ms"], 3)
+        return {
+            "user_id": None,
+            "action_type": action_type,
+            "description": f"{window['count']} requests aggregated over {self.window_seconds}s",
+            "endpoint": endpoint,
+            "method": method,
+            "payload": dict(window, aggregated=True, window_seconds=self.window_seconds),
+            "status_code": None,
+            "ip_address": None,
+            "timestamp": datetime.utcfromtimestamp(start),
+        }
+
+
+ALWAYS = ("always", None)
+
+
+def parse_log_policies(spec):
+    """
+    Parses "ACTION=policy,..." (or a dict) into {action_type: (kind, rate)}.
+    Policies are "always", "aggregate" or "sample:<rate>"; unknown actions log always.
+    """
+    if isinstance(spec, str):
+        spec = dict(item.split("=", 1) for item in spec.replace(" ", "").split(",") if "=" in item)
+    policies = {}
+    for action_type, policy in (spec or {}).items():
+        kind, _, rate = policy.partition(":")
+        if kind == "sample":
+            policies[action_type] = ("sample", float(rate))
+        elif kind == "aggregate":
+            policies[action_type] = ("aggregate", None)
+        else:
+            policies[action_type] = ALWAYS
+    return policies
+
+
+_log_writer = None
+_log_aggregator = None
+_log_writer_lock = threading.Lock()
+
+
+def get_log_writer(app):
+    """Return the process-wide activity log writer, starting it on first use."""
+    global _log_writer, _log_aggregator
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = ActivityLogWriter(
+                app,
+                batch_size=app.config.get("ACTIVITY_LOG_BATCH_SIZE", 200),
+                flush_interval=app.config.get("ACTIVITY_LOG_FLUSH_MS", 500) / 1000,
+                max_queue=app.config.get("ACTIVITY_LOG_QUEUE_SIZE", 10000),
+                overflow_policy=app.config.get("ACTIVITY_LOG_OVERFLOW_POLICY", "drop"),
+                sample_rate=app.config.get("ACTIVITY_LOG_OVERFLOW_SAMPLE_RATE", 0.1),
+                spill_path=app.config.get("STUDENT_LOGIN_SPILL_FILE"),
+            )
+            _log_aggregator = ActivityAggregator(app.config.get("ACTIVITY_LOG_AGGREGATE_SECONDS", 60))
+            _log_writer.add_periodic(lambda: _submit_summaries(_log_aggregator.pop_closed()))
+            _log_writer.start()
+            atexit.register(_log_writer.stop)
+            # Registered last so it runs first: open windows are queued before the final drain
+            atexit.register(lambda: _submit_summaries(_log_aggregator.pop_closed(force=True)))
+        return _log_writer
+
+
+def _submit_summaries(rows):
+    for row in rows:
+        _log_writer.submit(row)
+
+
+def get_log_writer_stats():
+    """Counters of the activity log writer, or None when it has not started."""
+    if _log_writer is None:
+        return None
+    stats = _log_writer.stats()
+    stats["aggregated_requests"] = _log_aggregator.recorded
+    stats["summary_rows"] = _log_aggregator.summaries
+    return stats
+
 
 def start_async_log(app, log_data):
     """
-    Dispatches the log insertion to a background thread to prevent blocking main UI request times.
+    Queues the log entry for the background writer to prevent blocking main UI request times.
+    """
+    get_log_writer(app).submit(log_data)
+
+
+def record_student_login(app, user):
+    """
+    Queues a StudentLoginLog row; it is written with the next batch, within
+    ACTIVITY_LOG_FLUSH_MS, so the login request itself normally performs no
+    writes. Only when the queue is saturated is the row inserted directly.
+    """
+    get_log_writer(app).submit(
+        {"user_id": user.id, "username": user.username, "login_time": datetime.utcnow()},
+        kind="student_login",
+    )
+
+def _classify_rule(rule, method):
+    """
+    Maps a URL rule and HTTP method to the activity type it represents, or None.
+    Only evaluated once per rule when the lookup table is built.
+    """
+    # 1. Login/Authentication Actions
+    if rule == "/api/auth/login" and method == "POST":
+        return "LOGIN"
+    # 2. Student Internship Applications
+    if rule.startswith("/api/student/placements/") and rule.endswith("/apply") and method == "POST":
+        return "APPLY_INTERNSHIP"
+    # 3. Company Status Updates
+    if rule.startswith("/api/company/applications/") and rule.endswith("/status") and method == "PUT":
+        return "STATUS_UPDATE"
+    # 4. Profile Edits
+    if rule == "/api/student/profile" and method in ["PUT", "POST"]:
+        return "UPDATE_PROFILE"
+    # 5. ML Predictions
+    if rule.startswith("/api/ml/predict") or rule.startswith("/api/ml/recommend"):
+        return "MODEL_PREDICTION"
+    # 6. Admin Actions
+    if rule.startswith("/api/admin/") and method in ["POST", "PUT", "DELETE"]:
+        return "ADMIN_ACTION"
+    return None
+
+
+def build_action_table(app):
+    """
+    Precomputes {(endpoint, method): action_type} for every logged route of the app.
+    """
+    table = {}
+    for rule in app.url_map.iter_rules():
+        for method in rule.methods:
+            if method == "OPTIONS":
+                continue
+            action_type = _classify_rule(rule.rule, method)
+            if action_type:
+                table[(rule.endpoint, method)] = action_type
+    return table
+
+
+DESCRIPTIONS = {
+    "LOGIN": lambda response, args: "User authenticated successfully" if response.status_code == 200 else "Failed login attempt",
+    "APPLY_INTERNSHIP": lambda response, args: f"Student applied for placement opportunity ID: {args.get('opp_id')}",
+    "STATUS_UPDATE": lambda response, args: f"Company updated application record ID: {args.get('record_id')}",
+    "UPDATE_PROFILE": lambda response, args: "Student generated or updated their profile",
+    "MODEL_PREDICTION": lambda response, args: "Machine learning model processing request",
+    "ADMIN_ACTION": lambda response, args: f"Admin modification request on {request.path}",
+}
+
+# Only these actions keep the request body; the rest are fully described by the route.
+PAYLOAD_ACTIONS = {"LOGIN", "STATUS_UPDATE", "ADMIN_ACTION"}
+MASKED_FIELDS = ("password",)
+
+
+def _request_identity():
+    """
+    User id from the JWT the route already verified, without decoding the token again.
     """
-    _log_executor.submit(_save_log_to_db, app, log_data)
+    # Set by routes that authenticate without a JWT, such as login
+    if g.get("activity_user_id") is not None:
+        return g.activity_user_id
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:
+        # The route did not check a JWT
+        return None
+    try:
+        return int(identity) if identity else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _request_payload():
+    # get_json() is cached, so this reuses the body the view already parsed
+    raw_json = request.get_json(silent=True) if request.is_json else None
+    if not isinstance(raw_json, dict) or not raw_json:
+        return None
+    # Do not log raw passwords
+    if any(f in raw_json for f in MASKED_FIELDS):
+        return {k: ("***" if k in MASKED_FIELDS else v) for k, v in raw_json.items()}
+    return raw_json
+
 
 def setup_logging_middleware(app):
     """
-    Hooks into Flask's after_request to automatically analyze and log specific actions based on routing.
+    Hooks into Flask's after_request to automatically log user actions, classified by endpoint.
     """
+    writer = get_log_writer(app)
+    policies = parse_log_policies(app.config.get("ACTIVITY_LOG_POLICIES"))
+    action_table = None
+
+    @app.before_request
+    def start_activity_timer():
+        g.activity_started = time.perf_counter()
+
     @app.after_request
     def log_user_activity(response):
-        # We only care about specific routes that indicate user 'actions'
-        path = request.path
-        method = request.method
-        
-        # Default ignore rules for static files and standard un-authenticated views
-        if path.startswith("/static/") or method == "OPTIONS":
-            return response
-            
-        action_type = None
-        description = None
-        
-        # 1. Login/Authentication Actions
-        if path == "/api/auth/login" and method == "POST":
-            action_type = "LOGIN"
-            description = "User authenticated successfully" if response.status_code == 200 else "Failed login attempt"
-            
-        # 2. Student Internship Applications
-        elif path.startswith("/api/student/placements/") and path.endswith("/apply") and method == "POST":
-            action_type = "APPLY_INTERNSHIP"
-            opp_id = path.split("/")[4]
-            description = f"Student applied for placement opportunity ID: {opp_id}"
-
-        # 3. Company Status Updates
-        elif path.startswith("/api/company/applications/") and path.endswith("/status") and method == "PUT":
-            action_type = "STATUS_UPDATE"
-            record_id = path.split("/")[4]
-            description = f"Company updated application record ID: {record_id}"
-            
-        # 4. Profile Edits
-        elif path == "/api/student/profile" and method in ["PUT", "POST"]:
-            action_type = "UPDATE_PROFILE"
-            description = "Student generated or updated their profile"
-            
-        # 5. ML Predictions
-        elif path.startswith("/api/ml/predict") or path.startswith("/api/ml/recommend"):
-            action_type = "MODEL_PREDICTION"
-            description = "Machine learning model processing request"
-            
-        # 6. Admin Actions
-        elif path.startswith("/api/admin/") and method in ["POST", "PUT", "DELETE"]:
-            action_type = "ADMIN_ACTION"
-            description = f"Admin modification request on {path}"
-            
-        # If no action matched, don't generate a log
+        nonlocal action_table
+        if action_table is None:
+            # Built on the first request, once every blueprint is registered
+            action_table = build_action_table(app)
+
+        action_type = action_table.get((request.endpoint, request.method))
         if not action_type:
             return response
-        
-        # Extract JWT user identity if present
-        from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-        user_id = None
-        try:
-            verify_jwt_in_request(optional=True)
-            identity = get_jwt_identity()
-            if identity:
-                user_id = int(identity)
-        except:
-            pass
-            
-        # Attempt to grab JSON payload
-        payload_data = None
-        if request.is_json:
-            try:
-                # Do not log raw passwords
-                raw_json = request.get_json(silent=True)
-                if raw_json:
-                    clean_json = dict(raw_json)
-                    if "password" in clean_json:
-                        clean_json["password"] = "***"
-                    payload_data = clean_json
-            except:
-                pass
-
-        # Construct payload and dispatch
+
+        policy, rate = policies.get(action_type, ALWAYS)
+        if policy == "aggregate":
+            latency_ms = (time.perf_counter() - g.get("activity_started", time.perf_counter())) * 1000
+            _log_aggregator.record(action_type, request.url_rule.rule, request.method,
+                                   response.status_code, latency_ms)
+            return response
+        if policy == "sample" and random.random() >= rate:
+            writer._count("policy_skipped")
+            return response
+
         log_data = {
-            "user_id": user_id,
+            "user_id": _request_identity(),
             "action_type": action_type,
-            "description": description,
-            "endpoint": path,
-            "method": method,
-            "payload": payload_data,
+            "description": DESCRIPTIONS[action_type](response, request.view_args or {}),
+            "endpoint": request.path,
+            "method": request.method,
+            "payload": _request_payload() if action_type in PAYLOAD_ACTIONS else None,
             "status_code": response.status_code,
             "ip_address": request.remote_addr or "127.0.0.1",
             "timestamp": datetime.utcnow()
         }
-        
+        if policy == "sample":
+            # Lets analytics scale sampled rows back up to request counts
+            log_data["payload"] = dict(log_data["payload"] or {}, sample_rate=rate)
+
         start_async_log(app, log_data)
         return response
@@ -5,10 +5,12 @@ Models:
     2. Salary Package Regressor — Predicts estimated salary in LPA
     3. Feature Importance — Extracted from the trained classifier
 """
+import hashlib
 import json
 import os
 import re
 import pickle
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
@@ -21,6 +23,15 @@ MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml_m
 CLASSIFIER_PATH = os.path.join(MODEL_DIR, "placement_classifier.pkl")
 REGRESSOR_PATH = os.path.join(MODEL_DIR, "salary_regressor.pkl")
 FEATURE_NAMES = ["cgpa", "programming_skills", "soft_skills", "internship_count", "certifications"]
+# Prediction request fields, in FEATURE_NAMES order
+INPUT_FIELDS = ["cgpa", "programming_skills_rating", "soft_skills_rating", "internship_count", "certification_count"]
+
+# What-if sweeps: at most two swept features and this many grid points
+MAX_SWEEP_AXES = 2
+MAX_SWEEP_POINTS = 2500
+SWEEP_CACHE_SIZE = 256
+# Salary range = these percentiles of the individual trees' predictions
+SALARY_INTERVAL_PERCENTILES = (10, 90)
 
 # ─── Skill category → numeric rating mappings ───
 TECH_SKILL_MAP = {
@@ -53,6 +64,8 @@ SOFT_SKILL_MAP = {
 _classifier = None
 _regressor = None
 _training_metrics = {}
+_model_digests = {}  # "classifier" / "regressor" -> sha256 of the pickled model
+_explainers = {}  # same keys -> (digest, bias, path contribution table, node values, per-tree node offsets)
 
 
 def _extract_skill_category(text, suffix_keyword):
@@ -142,10 +155,14 @@ def train_models():
     importances = dict(zip(FEATURE_NAMES, [round(float(v), 4) for v in clf.feature_importances_]))
 
     # Save models
+    clf_bytes = pickle.dumps(clf)
+    reg_bytes = pickle.dumps(reg)
     with open(CLASSIFIER_PATH, "wb") as f:
-        pickle.dump(clf, f)
+        f.write(clf_bytes)
     with open(REGRESSOR_PATH, "wb") as f:
-        pickle.dump(reg, f)
+        f.write(reg_bytes)
+    _model_digests["classifier"] = hashlib.sha256(clf_bytes).hexdigest()
+    _model_digests["regressor"] = hashlib.sha256(reg_bytes).hexdigest()
 
     _classifier = clf
     _regressor = reg
@@ -169,17 +186,195 @@ def _ensure_models_loaded():
     if _classifier is None:
         if os.path.exists(CLASSIFIER_PATH):
             with open(CLASSIFIER_PATH, "rb") as f:
-                _classifier = pickle.load(f)
+                data = f.read()
+            _classifier = pickle.loads(data)
+            _model_digests["classifier"] = hashlib.sha256(data).hexdigest()
         else:
             train_models()
     if _regressor is None:
         if os.path.exists(REGRESSOR_PATH):
             with open(REGRESSOR_PATH, "rb") as f:
-                _regressor = pickle.load(f)
+                data = f.read()
+            _regressor = pickle.loads(data)
+            _model_digests["regressor"] = hashlib.sha256(data).hexdigest()
         else:
             train_models()
 
 
+def get_model_version():
+    """Short identifier of the deployed classifier/regressor pair; changes on every retrain."""
+    _ensure_models_loaded()
+    combined = _model_digests["classifier"] + _model_digests["regressor"]
+    return hashlib.sha256(combined.encode()).hexdigest()[:16]
+
+
+def predict_placement_batch(X):
+    """Placement probability (0-1) for each row of an (N, 5) feature matrix."""
+    _ensure_models_loaded()
+    if len(X) == 0:
+        return np.empty(0)
+    return _classifier.predict_proba(X)[:, 1]
+
+
+def predict_sweep(base, axes):
+    """Evaluate the models over a grid of one or two swept features.
+
+    ``base`` holds the five input values in FEATURE_NAMES order; ``axes`` is
+    a sequence of ``(feature_index, values)`` pairs that override the base
+    value. Returns probability (percent), salary and salary range grids indexed
+    ``[i]`` or ``[i][j]`` by position along the axes. The whole grid is
+    scored in one model pass; results are cached per model version.
+    """
+    return _sweep_grid(
+        get_model_version(),
+        tuple(float(v) for v in base),
+        tuple((int(index), tuple(float(v) for v in values)) for index, values in axes),
+    )
+
+
+@lru_cache(maxsize=SWEEP_CACHE_SIZE)
+def _sweep_grid(model_version, base, axes):
+    grids = np.meshgrid(*[np.array(values) for _, values in axes], indexing="ij")
+    X = np.tile(np.array(base), (grids[0].size, 1))
+    for (index, _), grid in zip(axes, grids):
+        X[:, index] = grid.ravel()
+
+    probability = predict_placement_batch(X)
+    salary, low, high = predict_salary_batch(X)
+    shape = grids[0].shape
+    return {
+        "probability_placed": np.round(probability * 100, 2).reshape(shape).tolist(),
+        "predicted_salary_lpa": np.round(salary, 2).reshape(shape).tolist(),
+        "salary_min": np.round(low, 2).reshape(shape).tolist(),
+        "salary_max": np.round(high, 2).reshape(shape).tolist(),
+    }
+
+
+def _build_explainer(forest, node_values):
+    """Precompute tree-path contributions of every node of every tree in a forest.
+
+    For each node, row ``i`` of the table holds the change in the tree's
+    output attributed to each feature along the path from the root to node
+    ``i`` (each split's child-minus-parent value goes to the split feature).
+    Explaining a sample is then a leaf lookup per tree and a mean. The node
+    values of all trees are returned too, concatenated in the same order,
+    so per-tree predictions are the same lookup.
+    """
+    tables, all_values, offsets, roots = [], [], [], []
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        values = node_values(tree)
+        table = np.zeros((tree.node_count, len(FEATURE_NAMES)))
+        # Nodes are stored depth-first, so a parent always precedes its children
+        for parent in range(tree.node_count):
+            for child in (tree.children_left[parent], tree.children_right[parent]):
+                if child != -1:
+                    table[child] = table[parent]
+                    table[child, tree.feature[parent]] += values[child] - values[parent]
+        tables.append(table)
+        all_values.append(values)
+        offsets.append(offset)
+        roots.append(values[0])
+        offset += tree.node_count
+    return float(np.mean(roots)), np.concatenate(tables), np.concatenate(all_values), np.array(offsets)
+
+
+def _classifier_node_values(tree):
+    counts = tree.value[:, 0, :]
+    return counts[:, 1] / counts.sum(axis=1)
+
+
+def _regressor_node_values(tree):
+    return tree.value[:, 0, 0]
+
+
+def _explainer(kind):
+    _ensure_models_loaded()
+    digest = _model_digests[kind]
+    cached = _explainers.get(kind)
+    if cached is None or cached[0] != digest:
+        if kind == "classifier":
+            built = _build_explainer(_classifier, _classifier_node_values)
+        else:
+            built = _build_explainer(_regressor, _regressor_node_values)
+        cached = _explainers[kind] = (digest, *built)
+    return cached
+
+
+def _contributions(kind, forest, X):
+    _, bias, table, _, offsets = _explainer(kind)
+    leaves = forest.apply(X) + offsets  # (N, n_trees) rows of the table
+    return bias, table[leaves].mean(axis=1)
+
+
+def predict_salary_batch(X):
+    """Return ``(salary, low, high)`` arrays in LPA for an (N, 5) feature matrix.
+
+    ``salary`` is the forest prediction (the mean over trees); ``low`` and
+    ``high`` are SALARY_INTERVAL_PERCENTILES of the individual trees'
+    predictions, all from one leaf lookup over every tree.
+    """
+    X = np.asarray(X, dtype=float)
+    if len(X) == 0:
+        return np.empty(0), np.empty(0), np.empty(0)
+    _, _, _, values, offsets = _explainer("regressor")
+    per_tree = values[_regressor.apply(X) + offsets]  # (N, n_trees)
+    low, high = np.percentile(per_tree, SALARY_INTERVAL_PERCENTILES, axis=1)
+    return per_tree.mean(axis=1), low, high
+
+
+def explain_batch(X):
+    """Per-feature contributions for an (N, 5) feature matrix.
+
+    Returns ``{"placement": (bias, contributions), "salary": (bias,
+    contributions)}`` where contributions is (N, 5) in FEATURE_NAMES order
+    and ``bias + contributions.sum(axis=1)`` equals the model output
+    (probability of placement, salary in LPA).
+    """
+    _ensure_models_loaded()
+    X = np.asarray(X, dtype=float)
+    return {
+        "placement": _contributions("classifier", _classifier, X),
+        "salary": _contributions("regressor", _regressor, X),
+    }
+
+
+def explain_prediction(cgpa, programming_skills, soft_skills, internship_count, certifications):
+    """Why the models predict what they do for one input, keyed by input field.
+
+    Placement values are in percentage points of placement probability,
+    salary values in LPA; ``base_value`` is the forest's average output.
+    """
+    explained = explain_batch([[cgpa, programming_skills, soft_skills, internship_count, certifications]])
+    bias, contributions = explained["placement"]
+    salary_bias, salary_contributions = explained["salary"]
+    return {
+        "placement": {
+            "base_value": round(bias * 100, 2),
+            "contributions": dict(zip(INPUT_FIELDS, np.round(contributions[0] * 100, 2).tolist())),
+        },
+        "salary": {
+            "base_value": round(salary_bias, 2),
+            "contributions": dict(zip(INPUT_FIELDS, np.round(salary_contributions[0], 2).tolist())),
+        },
+    }
+
+
+def explain_cohort(X):
+    """Mean per-feature contributions over a cohort's (N, 5) feature matrix, keyed by input field."""
+    explained = explain_batch(X)
+    result = {}
+    for name, scale in (("placement", 100), ("salary", 1)):
+        bias, contributions = explained[name]
+        result[name] = {
+            "base_value": round(bias * scale, 2),
+            "mean_prediction": round(float((bias + contributions.sum(axis=1)).mean()) * scale, 2),
+            "mean_contributions": dict(zip(INPUT_FIELDS, np.round(contributions.mean(axis=0) * scale, 2).tolist())),
+        }
+    return result
+
+
 def predict_placement(cgpa, programming_skills, soft_skills, internship_count, certifications):
     """Predict placement status. Returns dict with prediction and probability."""
     _ensure_models_loaded()
@@ -197,16 +392,14 @@ def predict_placement(cgpa, programming_skills, soft_skills, internship_count, c
 
 
 def predict_salary(cgpa, programming_skills, soft_skills, internship_count, certifications):
-    """Predict salary package in LPA."""
-    _ensure_models_loaded()
-    features = np.array([[cgpa, programming_skills, soft_skills, internship_count, certifications]])
-    salary = float(_regressor.predict(features)[0])
+    """Predict salary package in LPA, with the range the forest's trees agree on."""
+    salary, low, high = predict_salary_batch([[cgpa, programming_skills, soft_skills, internship_count, certifications]])
 
     return {
-        "predicted_salary_lpa": round(salary, 2),
+        "predicted_salary_lpa": round(float(salary[0]), 2),
         "salary_range": {
-            "min": round(max(salary - 1.0, 2.5), 2),
-            "max": round(salary + 1.0, 2),
+            "min": round(float(low[0]), 2),
+            "max": round(float(high[0]), 2),
         },
     }
 
@@ -229,31 +422,23 @@ def get_training_metrics():
 def recommend_students(job_skills_text, top_n=5):
     """
     Recommend students based on job skills using TF-IDF and Cosine Similarity.
-    This fetches all verified students, combines their skills, and returns top matches.
+    Matches against the skills/projects text of all verified students and returns top matches.
     """
+    from database import db
+    from models.student_features import StudentFeatures
     from models.student_profile import StudentProfile
-    
-    # Get all verified students
-    students = StudentProfile.query.filter_by(is_verified=True).all()
-    if not students:
-        return []
 
-    # Prepare corpus: combine student skills and projects
-    student_docs = []
-    student_map = []
-    for s in students:
-        try:
-            skills = " ".join(json.loads(s.skills) if s.skills else [])
-        except:
-            skills = ""
-        try:
-            projects = " ".join(json.loads(s.projects) if s.projects else [])
-        except:
-            projects = ""
-            
-        doc = f"{skills} {projects}".strip()
-        student_docs.append(doc)
-        student_map.append(s)
+    # Corpus of verified students: skills and projects text from the feature store
+    rows = (
+        db.session.query(StudentFeatures.profile_id, StudentFeatures.document)
+        .join(StudentProfile, StudentProfile.id == StudentFeatures.profile_id)
+        .filter(StudentProfile.is_verified == True)
+        .all()
+    )
+    if not rows:
+        return []
+    student_ids = [r[0] for r in rows]
+    student_docs = [r[1] for r in rows]
 
     # Add the query to the corpus
     docs = [job_skills_text] + student_docs
@@ -266,13 +451,18 @@ def recommend_students(job_skills_text, top_n=5):
     sim_scores = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
 
     # Get top matching indices
-    top_indices = sim_scores.argsort()[::-1][:top_n]
+    top_indices = [idx for idx in sim_scores.argsort()[::-1][:top_n] if sim_scores[idx] > 0]
+    students = {
+        s.id: s for s in StudentProfile.query.filter(
+            StudentProfile.id.in_([student_ids[idx] for idx in top_indices])
+        )
+    }
 
     results = []
     for idx in top_indices:
         score = float(sim_scores[idx])
-        if score > 0:  # Only return matches with some similarity
-            student = student_map[idx]
+        student = students.get(student_ids[idx])
+        if student is not None:
             match_pct = round(score * 100, 1)
             results.append({
                 "id": student.id,
@@ -0,0 +1,115 @@
+"""Password verification in a dedicated, bounded thread pool.
+
+Password hashes are deliberately expensive (scrypt by default), so
+checking them inline lets a login storm occupy every request thread.
+Verification runs in ``PASSWORD_HASH_WORKERS`` threads instead (hashlib
+releases the GIL while hashing); when those are busy and
+``PASSWORD_HASH_QUEUE_DEPTH`` checks are already waiting,
+``PasswordHashBusy`` is raised immediately so the caller can answer 503.
+
+Hashes created with other parameters than ``PASSWORD_HASH_METHOD`` are
+upgraded after a successful login, in the background.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from sqlalchemy import update
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import Config
+
+
+class PasswordHashBusy(Exception):
+    """All hashing workers are busy and the wait queue is full (or the check timed out)."""
+
+
+_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE_DEPTH)
+
+_method_prefixes = {}  # method -> parameter prefix of hashes it produces (None while being derived)
+
+
+def hash_password(password, method=None):
+    """Hash a password with the configured (or given) werkzeug method."""
+    return generate_password_hash(password, method=method or Config.PASSWORD_HASH_METHOD)
+
+
+def _submit(func, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashBusy()
+    try:
+        future = _executor.submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def verify_password(password_hash, password):
+    """Check a password in the hashing pool. Raises PasswordHashBusy when saturated."""
+    future = _submit(check_password_hash, password_hash, password)
+    try:
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise PasswordHashBusy()
+
+
+def _method_prefix(method):
+    # werkzeug fills in default parameters, so derive the prefix from a real hash
+    _method_prefixes[method] = generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def _derive_method_prefix(method):
+    """Derive the parameter prefix of ``method`` in the hashing pool, once."""
+    if method not in _method_prefixes:
+        _method_prefixes[method] = None  # pending
+        _executor.submit(_method_prefix, method)
+
+
+def needs_rehash(password_hash, method=None):
+    """True when ``password_hash`` was not produced with the current hash parameters.
+
+    Never hashes on the caller's thread: until the pool has derived the
+    prefix of ``method`` this returns False, and the hash is upgraded on a
+    later login.
+    """
+    method = method or Config.PASSWORD_HASH_METHOD
+    _derive_method_prefix(method)
+    prefix = _method_prefixes[method]
+    return prefix is not None and password_hash.split("$", 1)[0] != prefix
+
+
+_derive_method_prefix(Config.PASSWORD_HASH_METHOD)
+
+
+def schedule_rehash(app, user_id, old_hash, password):
+    """Re-hash a password with the current parameters without delaying the login.
+
+    Skipped when the pool is saturated; it will be retried on a later login.
+    Only applied if the stored hash is still ``old_hash``.
+    """
+    try:
+        _submit(_rehash, app, user_id, old_hash, password)
+    except PasswordHashBusy:
+        pass
+
+
+def _rehash(app, user_id, old_hash, password):
+    from database import db
+    from models.user import User
+
+    new_hash = hash_password(password)
+    with app.app_context():
+        try:
+            table = User.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.id == user_id, table.c.password_hash == old_hash)
+                .values(password_hash=new_hash)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[Auth] Could not upgrade password hash for user {user_id}: {e}")
@@ -0,0 +1,215 @@
+"""Materialized placement/salary predictions per student.
+
+Browsing and exports sort and filter on ``student_predictions`` instead of
+calling the models per row. A row is stale when the feature store marked
+it dirty (its features changed) or when it was scored by another model
+version than the deployed one. ``refresh_predictions`` rescores only the
+stale rows, in id-ordered batches with one vectorized model call each.
+
+A refresh is scheduled on a single background worker after every commit
+that dirtied predictions, at startup and after retraining; requests that
+arrive while one is pending are coalesced into it.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, delete, event, exists, insert, inspect, literal, or_, select, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from database import db
+from models.student_prediction import StudentPrediction
+from models.student_profile import StudentProfile
+from services.feature_store import feature_matrix
+
+PREDICTION_BATCH_SIZE = 5000
+
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction-refresh")
+_refresh_lock = threading.Lock()
+_refresh_scheduled = False
+
+
+def refresh_predictions(full=False, batch_size=PREDICTION_BATCH_SIZE):
+    """Rescore stale predictions (every prediction when ``full``).
+
+    A row is only marked clean if its revision did not change while it was
+    being scored; otherwise it stays dirty for the next refresh.
+    """
+    from services.ml_service import get_model_version, predict_placement_batch, predict_salary_batch
+
+    started = time.perf_counter()
+    version = get_model_version()
+    table = StudentPrediction.__table__
+    write = (
+        update(table)
+        .where(table.c.profile_id == bindparam("pid"), table.c.revision == bindparam("rev"))
+        .values(
+            placement_probability=bindparam("prob"),
+            predicted_salary_lpa=bindparam("salary"),
+            predicted_salary_min=bindparam("salary_min"),
+            predicted_salary_max=bindparam("salary_max"),
+            model_version=version,
+            dirty=False,
+            scored_at=bindparam("now"),
+        )
+    )
+
+    query = db.session.query(StudentPrediction.profile_id, StudentPrediction.revision)
+    if not full:
+        query = query.filter(or_(
+            StudentPrediction.dirty == True,
+            StudentPrediction.model_version.is_(None),
+            StudentPrediction.model_version != version,
+        ))
+
+    scored = 0
+    last_id = 0
+    while True:
+        rows = query.filter(StudentPrediction.profile_id > last_id) \
+            .order_by(StudentPrediction.profile_id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        revisions = dict(rows)
+
+        ids, X = feature_matrix(revisions.keys())
+        probability = predict_placement_batch(X)
+        salary, low, high = (np.round(a, 2) for a in predict_salary_batch(X))
+        now = datetime.utcnow()
+        params = [
+            {"pid": pid, "rev": revisions[pid], "prob": float(probability[i]), "salary": float(salary[i]),
+             "salary_min": float(low[i]), "salary_max": float(high[i]), "now": now}
+            for i, pid in enumerate(ids)
+        ]
+        if params:
+            db.session.execute(write, params)
+        db.session.commit()
+        scored += len(params)
+
+    elapsed = time.perf_counter() - started
+    return {"model_version": version, "scored": scored, "seconds": round(elapsed, 3)}
+
+
+def _add_missing_columns(table):
+    """Add nullable columns the model has but the database table lacks (tables created by older versions).
+
+    Safe with several worker processes starting at once: a column another
+    process added first is accepted. Returns True if any column was missing.
+    """
+    existing = {c["name"] for c in inspect(db.engine).get_columns(table.name)}
+    missing = [c for c in table.columns if c.name not in existing]
+    for column in missing:
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}"
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+        except DBAPIError:
+            if column.name not in {c["name"] for c in inspect(db.engine).get_columns(table.name)}:
+                raise
+    return bool(missing)
+
+
+def ensure_prediction_store():
+    """Add prediction rows for profiles that have none and drop rows of deleted profiles.
+
+    Columns added since the table was created are added in place, and every
+    row is marked dirty so the next refresh fills them in.
+    """
+    table = StudentPrediction.__table__
+    profiles = StudentProfile.__table__
+    if _add_missing_columns(table):
+        db.session.execute(update(table).values(revision=table.c.revision + 1, dirty=True))
+    missing = select(profiles.c.id, literal(1), literal(True)).where(
+        ~exists().where(table.c.profile_id == profiles.c.id)
+    )
+    db.session.execute(insert(table).from_select(["profile_id", "revision", "dirty"], missing))
+    db.session.execute(delete(table).where(table.c.profile_id.not_in(select(profiles.c.id))))
+    db.session.commit()
+
+
+def _run_refresh(app):
+    global _refresh_scheduled
+    with _refresh_lock:
+        # Commits from here on schedule another run
+        _refresh_scheduled = False
+    with app.app_context():
+        try:
+            refresh_predictions()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ML] Could not refresh stored predictions: {e}")
+
+
+def schedule_prediction_refresh(app):
+    """Refresh stale predictions in the background (coalesced with a pending run)."""
+    global _refresh_scheduled
+    with _refresh_lock:
+        if _refresh_scheduled:
+            return
+        _refresh_scheduled = True
+    _refresh_executor.submit(_run_refresh, app)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    if session.info.pop("predictions_dirty", False) and has_app_context():
+        schedule_prediction_refresh(current_app._get_current_object())
+
+
+PREDICTION_FILTERS = ("min_placement_probability", "min_predicted_salary")
+
+
+def parse_prediction_filters(args):
+    """Read the prediction filters from request args as floats.
+
+    Raises ValueError naming the offending parameter when a value is not a number.
+    """
+    filters = {}
+    for name in PREDICTION_FILTERS:
+        value = args.get(name)
+        if value in (None, ""):
+            continue
+        try:
+            filters[name] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number")
+    return filters
+
+
+def with_predictions(query, filters=None):
+    """Outer-join the stored predictions onto a StudentProfile query.
+
+    Supports the ``min_placement_probability`` (0-1) and ``min_predicted_salary``
+    (LPA) filters, as parsed by ``parse_prediction_filters``; the query then
+    yields ``(profile, prediction)`` tuples, with ``prediction`` None for
+    profiles not scored yet.
+    """
+    query = query.outerjoin(StudentPrediction, StudentPrediction.profile_id == StudentProfile.id) \
+        .add_entity(StudentPrediction)
+    filters = filters or {}
+    if filters.get("min_placement_probability") is not None:
+        query = query.filter(StudentPrediction.placement_probability >= filters["min_placement_probability"])
+    if filters.get("min_predicted_salary") is not None:
+        query = query.filter(StudentPrediction.predicted_salary_lpa >= filters["min_predicted_salary"])
+    return query
+
+
+def prediction_fields(prediction):
+    """The prediction fields added to a serialized profile (all None before it is first scored)."""
+    if prediction is None or prediction.model_version is None:
+        return {
+            "placement_probability": None,
+            "predicted_salary_lpa": None,
+            "predicted_salary_range": None,
+            "prediction_model_version": None,
+        }
+    return {
+        "placement_probability": round(prediction.placement_probability, 4),
+        "predicted_salary_lpa": prediction.predicted_salary_lpa,
+        "predicted_salary_range": {"min": prediction.predicted_salary_min, "max": prediction.predicted_salary_max},
+        "prediction_model_version": prediction.model_version,
+    }
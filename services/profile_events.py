@@ -0,0 +1,63 @@
+"""Change tracking for StudentProfile rows.
+
+Anything that caches data derived from student profiles (report summaries,
+department statistics, ...) reads ``get_data_version()`` and treats a
+different value as "profile data changed since I cached this".
+"""
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_version_lock = threading.Lock()
+_data_version = 0
+_bulk_generation = 0
+
+
+def get_data_version():
+    """Return the current in-process profile data version."""
+    return _data_version
+
+
+def get_bulk_generation():
+    """Return a counter that only moves on ``mark_profiles_changed()``.
+
+    Structures that keep themselves up to date from ORM flushes (rankings,
+    ...) only need a full rebuild when this changes.
+    """
+    return _bulk_generation
+
+
+def mark_profiles_changed():
+    """Bump the data version. Bulk UPDATE/DELETE paths that bypass the ORM
+    unit of work must call this themselves."""
+    global _data_version, _bulk_generation
+    with _version_lock:
+        _data_version += 1
+        _bulk_generation += 1
+
+
+def _bump_data_version():
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _remember_profile_changes(session, flush_context):
+    from models.student_profile import StudentProfile
+
+    touched = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, StudentProfile) for obj in touched):
+        session.info["profiles_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_version_on_commit(session):
+    if session.info.pop("profiles_changed", False):
+        _bump_data_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes_on_rollback(session):
+    session.info.pop("profiles_changed", None)
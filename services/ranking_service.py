@@ -0,0 +1,188 @@
+"""In-memory percentile rank and leaderboard service.
+
+Keeps, per department (plus an institution-wide bucket), a sorted list of
+``(value, profile_id)`` for each ranked metric over verified students.
+Rank, percentile and top-N queries are binary searches / slices; committed
+profile changes are applied incrementally with ``insort``.
+
+The structure is per process. It is built lazily, rebuilt after bulk
+changes (``mark_profiles_changed``) and refreshed every
+``REFRESH_SECONDS`` so changes committed by other worker processes show up
+within a bounded delay.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import db
+from models.student_profile import StudentProfile
+from services.profile_events import get_bulk_generation
+
+# Public metric name -> StudentProfile column
+METRICS = {
+    "employability": "employability_score",
+    "cgpa": "cgpa",
+}
+ALL_DEPARTMENTS = "*"
+REFRESH_SECONDS = 300
+
+_lock = threading.RLock()
+_sorted = {}    # department -> metric -> [(value, profile_id), ...] ascending
+_members = {}   # profile_id -> (department, {metric: value})
+_built_at = None
+_built_generation = None
+
+
+def _entry_for(profile):
+    """Return the ranking entry of a profile, or None when it is not ranked."""
+    if not profile.is_verified:
+        return None
+    values = {m: getattr(profile, col) for m, col in METRICS.items()}
+    return (profile.department or "", values)
+
+
+def _insert(profile_id, entry):
+    dept, values = entry
+    for bucket in (dept, ALL_DEPARTMENTS):
+        lists = _sorted.setdefault(bucket, {m: [] for m in METRICS})
+        for metric, value in values.items():
+            if value is not None:
+                insort(lists[metric], (value, profile_id))
+    _members[profile_id] = entry
+
+
+def _remove(profile_id):
+    entry = _members.pop(profile_id, None)
+    if entry is None:
+        return
+    dept, values = entry
+    for bucket in (dept, ALL_DEPARTMENTS):
+        lists = _sorted.get(bucket)
+        if not lists:
+            continue
+        for metric, value in values.items():
+            if value is None:
+                continue
+            items = lists[metric]
+            i = bisect_left(items, (value, profile_id))
+            if i < len(items) and items[i] == (value, profile_id):
+                del items[i]
+
+
+def _build():
+    global _built_at, _built_generation
+    rows = (
+        db.session.query(StudentProfile.id, StudentProfile.department,
+                         StudentProfile.employability_score, StudentProfile.cgpa)
+        .filter(StudentProfile.is_verified == True)
+        .all()
+    )
+    sorted_lists = {}
+    members = {}
+    for profile_id, dept, score, cgpa in rows:
+        entry = (dept or "", {"employability": score, "cgpa": cgpa})
+        members[profile_id] = entry
+        for bucket in (entry[0], ALL_DEPARTMENTS):
+            lists = sorted_lists.setdefault(bucket, {m: [] for m in METRICS})
+            for metric, value in entry[1].items():
+                if value is not None:
+                    lists[metric].append((value, profile_id))
+    for lists in sorted_lists.values():
+        for items in lists.values():
+            items.sort()
+
+    _sorted.clear()
+    _sorted.update(sorted_lists)
+    _members.clear()
+    _members.update(members)
+    _built_at = time.monotonic()
+    _built_generation = get_bulk_generation()
+
+
+def _ensure_built():
+    with _lock:
+        stale = _built_at is None or time.monotonic() - _built_at > REFRESH_SECONDS
+        if stale or _built_generation != get_bulk_generation():
+            _build()
+
+
+def invalidate_rankings():
+    """Force a rebuild on the next query."""
+    global _built_at
+    with _lock:
+        _built_at = None
+
+
+# ─── Incremental maintenance ───
+
+@event.listens_for(Session, "after_flush")
+def _collect_ranking_changes(session, flush_context):
+    changes = session.info.setdefault("ranking_changes", {})
+    for obj in session.new:
+        if isinstance(obj, StudentProfile):
+            changes[obj.id] = _entry_for(obj)
+    for obj in session.dirty:
+        if isinstance(obj, StudentProfile):
+            changes[obj.id] = _entry_for(obj)
+    for obj in session.deleted:
+        if isinstance(obj, StudentProfile):
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_ranking_changes(session):
+    changes = session.info.pop("ranking_changes", None)
+    if not changes or _built_at is None:
+        return
+    with _lock:
+        for profile_id, entry in changes.items():
+            if _members.get(profile_id) == entry:
+                continue
+            _remove(profile_id)
+            if entry is not None:
+                _insert(profile_id, entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_ranking_changes(session):
+    session.info.pop("ranking_changes", None)
+
+
+# ─── Queries ───
+
+def get_rank(department, metric, value):
+    """Rank of ``value`` among verified students of ``department``.
+
+    Pass ``department=None`` to rank against every department. Returns None
+    when nobody is ranked yet.
+    """
+    _ensure_built()
+    bucket = ALL_DEPARTMENTS if department is None else department or ""
+    with _lock:
+        items = _sorted.get(bucket, {}).get(metric, [])
+        total = len(items)
+        if not total or value is None:
+            return None
+        higher = total - bisect_right(items, (value, float("inf")))
+        lower = bisect_left(items, (value, float("-inf")))
+
+    rank = higher + 1
+    return {
+        "rank": rank,
+        "out_of": total,
+        "percentile": round(lower / total * 100, 1),
+        "top_percent": round(rank / total * 100, 1),
+    }
+
+
+def get_top(department, metric, n=10):
+    """Return ``[(profile_id, value), ...]`` for the best ``n`` students, best first."""
+    _ensure_built()
+    bucket = ALL_DEPARTMENTS if department is None else department or ""
+    with _lock:
+        items = _sorted.get(bucket, {}).get(metric, [])
+        top = items[-n:] if n > 0 else []
+    return [(profile_id, value) for value, profile_id in reversed(top)]
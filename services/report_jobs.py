@@ -0,0 +1,141 @@
+"""Background generation of PDF reports.
+
+Requesting a report records a ``ReportJob`` and hands it to a single
+worker thread; the client polls the job and downloads the finished file.
+A job is reused instead of re-rendered when a report with the same
+filters was already produced (or is in progress) for the same data
+fingerprint, i.e. no student profile was added, removed or updated since.
+"""
+import hashlib
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from database import db
+from models.report_job import ReportJob
+from models.student_profile import StudentProfile
+from services.report_service import generate_pdf_report
+
+REPORT_FILTER_KEYS = ("department", "min_cgpa", "skills", "placement_status", "verified_only")
+# Queued/running jobs older than this are assumed lost (e.g. the server restarted).
+STALE_JOB_AFTER = timedelta(minutes=30)
+
+_report_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def _canonical_filters(filters):
+    return json.dumps({k: filters.get(k) for k in REPORT_FILTER_KEYS if filters.get(k)}, sort_keys=True)
+
+
+def data_fingerprint():
+    """Summarize the profile table so any insert, delete or update changes it."""
+    count, last_update, last_id = db.session.query(
+        func.count(StudentProfile.id),
+        func.max(StudentProfile.updated_at),
+        func.max(StudentProfile.id),
+    ).one()
+    return f"{count}:{last_update.isoformat() if last_update else '-'}:{last_id or 0}"
+
+
+def _report_path(job_id):
+    return os.path.join(current_app.config["REPORT_FOLDER"], f"{job_id}.pdf")
+
+
+def _is_reusable(job):
+    if job.status == "done":
+        return bool(job.file_path) and os.path.exists(job.file_path)
+    if job.status in ("queued", "running"):
+        return job.created_at and datetime.utcnow() - job.created_at < STALE_JOB_AFTER
+    return False
+
+
+def request_pdf_report(filters, user_id=None):
+    """Return ``(job, reused)`` for a PDF report, enqueueing a new job when needed."""
+    canonical = _canonical_filters(filters)
+    filters_key = hashlib.sha256(f"pdf|{canonical}".encode()).hexdigest()
+    fingerprint = data_fingerprint()
+
+    existing = (
+        ReportJob.query
+        .filter_by(filters_key=filters_key, data_fingerprint=fingerprint)
+        .filter(ReportJob.status.in_(("queued", "running", "done")))
+        .order_by(ReportJob.created_at.desc())
+        .first()
+    )
+    if existing and _is_reusable(existing):
+        return existing, True
+
+    job = ReportJob(
+        id=uuid.uuid4().hex,
+        kind="pdf",
+        filters=canonical,
+        filters_key=filters_key,
+        data_fingerprint=fingerprint,
+        status="queued",
+        requested_by=user_id,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _report_executor.submit(_run_pdf_job, current_app._get_current_object(), job.id)
+    return job, False
+
+
+def _run_pdf_job(app, job_id):
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        if job is None:
+            return
+        job.status = "running"
+        db.session.commit()
+
+        path = _report_path(job_id)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            generate_pdf_report(json.loads(job.filters or "{}"), tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            db.session.rollback()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            job = db.session.get(ReportJob, job_id)
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            print(f"[Reports] PDF job {job_id} failed: {e}")
+            return
+
+        job.status = "done"
+        job.file_path = path
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        _remove_superseded(job)
+
+
+def _remove_superseded(job):
+    """Delete older finished files for the same filters; only the latest is reused."""
+    older = (
+        ReportJob.query
+        .filter(ReportJob.filters_key == job.filters_key,
+                ReportJob.id != job.id,
+                ReportJob.status == "done",
+                ReportJob.created_at < job.created_at)
+        .all()
+    )
+    for old in older:
+        if old.file_path and os.path.exists(old.file_path):
+            try:
+                os.remove(old.file_path)
+            except OSError:
+                pass
+        old.status = "expired"
+        old.file_path = None
+    if older:
+        db.session.commit()
@@ -1,8 +1,13 @@
 import csv
 import io
 import json
+import tempfile
+import threading
+import time
 from datetime import datetime
 
+from sqlalchemy import func
+
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet
@@ -12,6 +17,15 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from database import db
 from models.student_profile import StudentProfile
 from models.user import User
+from services.prediction_store import with_predictions
+from services.profile_events import get_data_version
+
+# Company report summaries, keyed by filter combination. An entry is valid
+# while the profile data version is unchanged; the TTL bounds staleness when
+# another worker process made the change.
+SUMMARY_CACHE_TTL = 300
+_summary_cache = {}
+_summary_cache_lock = threading.Lock()
 
 
 def _apply_filters(query, filters):
@@ -30,22 +44,42 @@ def _apply_filters(query, filters):
     return query
 
 
+CSV_HEADER = [
+    "Roll Number", "Full Name", "Department", "CGPA",
+    "10th %", "12th %", "Skills", "Certifications",
+    "Internship Count", "Projects", "Employability Score",
+    "Placement Probability", "Predicted Salary (LPA)",
+    "Predicted Salary Min (LPA)", "Predicted Salary Max (LPA)",
+    "Placement Status", "Placement Company", "Verified",
+]
+EXPORT_BATCH_SIZE = 1000
+PREDICTION_FIELDS = ("placement_probability", "predicted_salary_lpa", "predicted_salary_min", "predicted_salary_max")
+CSV_CHUNK_BYTES = 64 * 1024
+
+
+def _prediction_values(prediction):
+    """Stored prediction values in PREDICTION_FIELDS order (None when not scored yet)."""
+    if prediction is None or prediction.model_version is None:
+        return (None,) * len(PREDICTION_FIELDS)
+    return (round(prediction.placement_probability, 4), prediction.predicted_salary_lpa,
+            prediction.predicted_salary_min, prediction.predicted_salary_max)
+
+
 def generate_csv_report(filters):
-    """Generate a CSV string of student profiles matching the given filters."""
+    """Yield a CSV of student profiles matching the given filters, in chunks.
+
+    Rows are fetched ``EXPORT_BATCH_SIZE`` at a time from a streaming
+    cursor and flushed every ~64 KB, so memory stays flat no matter how
+    many students match and the first bytes go out immediately.
+    """
     query = StudentProfile.query.join(User)
-    query = _apply_filters(query, filters)
-    profiles = query.all()
+    query = with_predictions(_apply_filters(query, filters), filters)
 
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow([
-        "Roll Number", "Full Name", "Department", "CGPA",
-        "10th %", "12th %", "Skills", "Certifications",
-        "Internship Count", "Projects", "Employability Score",
-        "Placement Status", "Placement Company", "Verified",
-    ])
+    writer.writerow(CSV_HEADER)
 
-    for p in profiles:
+    for p, prediction in query.yield_per(EXPORT_BATCH_SIZE):
         skills = json.loads(p.skills) if p.skills else []
         certs = json.loads(p.certifications) if p.certifications else []
         projects = json.loads(p.projects) if p.projects else []
@@ -56,21 +90,264 @@ def generate_csv_report(filters):
             "; ".join(skills), "; ".join(certs),
             p.internship_count, "; ".join(projects),
             round(p.employability_score, 2),
+            *("" if v is None else v for v in _prediction_values(prediction)),
             p.placement_status, p.placement_company or "",
             "Yes" if p.is_verified else "No",
         ])
 
-    return output.getvalue()
+        if output.tell() >= CSV_CHUNK_BYTES:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+
+    yield output.getvalue()
+
+
+# ─── Typed bulk exports ───
+#
+# Unlike the CSV, these keep numbers as numbers and list fields as lists.
+# Every format streams the filtered query in EXPORT_BATCH_SIZE batches.
+
+EXPORT_FIELDS = [
+    "profile_id", "roll_number", "full_name", "department", "cgpa",
+    "tenth_percentage", "twelfth_percentage", "skills", "certifications",
+    "internship_count", "projects", "employability_score",
+    "placement_probability", "predicted_salary_lpa",
+    "predicted_salary_min", "predicted_salary_max",
+    "placement_status", "placement_company", "is_verified",
+]
+LIST_FIELDS = ("skills", "certifications", "projects")
+PARQUET_ROW_GROUP_SIZE = 20000
+
+
+def _json_list(value):
+    try:
+        items = json.loads(value) if value else []
+    except (json.JSONDecodeError, TypeError):
+        return []
+    return [str(i) for i in items] if isinstance(items, list) else []
+
+
+def _export_record(p, prediction):
+    return {
+        "profile_id": p.id,
+        "roll_number": p.roll_number,
+        "full_name": p.full_name,
+        "department": p.department,
+        "cgpa": p.cgpa,
+        "tenth_percentage": p.tenth_percentage,
+        "twelfth_percentage": p.twelfth_percentage,
+        "skills": _json_list(p.skills),
+        "certifications": _json_list(p.certifications),
+        "internship_count": p.internship_count,
+        "projects": _json_list(p.projects),
+        "employability_score": round(p.employability_score or 0, 2),
+        **dict(zip(PREDICTION_FIELDS, _prediction_values(prediction))),
+        "placement_status": p.placement_status,
+        "placement_company": p.placement_company,
+        "is_verified": bool(p.is_verified),
+    }
+
+
+def _export_batches(filters, size=EXPORT_BATCH_SIZE):
+    """Yield lists of export records, ``size`` at a time."""
+    query = _apply_filters(StudentProfile.query.join(User), filters)
+    query = with_predictions(query, filters).order_by(StudentProfile.id)
+    batch = []
+    for p, prediction in query.yield_per(EXPORT_BATCH_SIZE):
+        batch.append(_export_record(p, prediction))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_ndjson_report(filters):
+    """Yield newline-delimited JSON, one student profile per line."""
+    output = io.StringIO()
+    for batch in _export_batches(filters):
+        for record in batch:
+            output.write(json.dumps(record))
+            output.write("\n")
+        if output.tell() >= CSV_CHUNK_BYTES:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
+class _StreamSink:
+    """Write-only file object that hands written bytes back to a generator.
+
+    pyarrow records offsets via ``tell()``, so the position keeps counting
+    even though drained bytes are no longer held.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(pa):
+    return pa.schema([
+        ("profile_id", pa.int64()),
+        ("roll_number", pa.string()),
+        ("full_name", pa.string()),
+        ("department", pa.string()),
+        ("cgpa", pa.float64()),
+        ("tenth_percentage", pa.float64()),
+        ("twelfth_percentage", pa.float64()),
+        ("skills", pa.list_(pa.string())),
+        ("certifications", pa.list_(pa.string())),
+        ("internship_count", pa.int32()),
+        ("projects", pa.list_(pa.string())),
+        ("employability_score", pa.float64()),
+        ("placement_probability", pa.float64()),
+        ("predicted_salary_lpa", pa.float64()),
+        ("predicted_salary_min", pa.float64()),
+        ("predicted_salary_max", pa.float64()),
+        ("placement_status", pa.string()),
+        ("placement_company", pa.string()),
+        ("is_verified", pa.bool_()),
+    ])
+
 
+def generate_parquet_report(filters):
+    """Return a generator yielding a Parquet file of student profiles, one row group at a time.
 
-def generate_pdf_report(filters):
-    """Generate a PDF report of student profiles matching the given filters."""
+    pyarrow is imported here, not at module load, so only Parquet exports
+    pay for it; raises ImportError when it is not installed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    return _parquet_chunks(filters, pa, pq)
+
+
+def _parquet_chunks(filters, pa, pq):
+    schema = _parquet_schema(pa)
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        for batch in _export_batches(filters, PARQUET_ROW_GROUP_SIZE):
+            columns = {name: [r[name] for r in batch] for name in EXPORT_FIELDS}
+            writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def generate_xlsx_report(filters):
+    """Return a generator yielding an XLSX workbook of student profiles.
+
+    Rows are appended in openpyxl's write-only mode; the finished workbook
+    is spooled to a temporary file (a zip has to be complete before it can
+    be sent) and streamed from there. Like pyarrow for Parquet, openpyxl is
+    imported on use; raises ImportError when it is not installed.
+    """
+    from openpyxl import Workbook
+
+    return _xlsx_chunks(filters, Workbook)
+
+
+def _xlsx_chunks(filters, Workbook):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Students")
+    sheet.append(EXPORT_FIELDS)
+    for batch in _export_batches(filters):
+        for record in batch:
+            sheet.append([
+                "; ".join(record[f]) if f in LIST_FIELDS else record[f]
+                for f in EXPORT_FIELDS
+            ])
+
+    with tempfile.TemporaryFile() as f:
+        workbook.save(f)
+        f.seek(0)
+        for chunk in iter(lambda: f.read(CSV_CHUNK_BYTES), b""):
+            yield chunk
+
+
+# Format -> (generator, mimetype, file extension)
+EXPORT_FORMATS = {
+    "csv": (generate_csv_report, "text/csv", "csv"),
+    "ndjson": (generate_ndjson_report, "application/x-ndjson", "ndjson"),
+    "parquet": (generate_parquet_report, "application/vnd.apache.parquet", "parquet"),
+    "xlsx": (generate_xlsx_report, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+
+# Rows per PDF table, roughly one landscape A4 page. Laying out many small
+# tables keeps reportlab's split work linear instead of re-measuring one huge
+# table on every page.
+PDF_ROWS_PER_TABLE = 25
+
+PDF_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1a1a2e")),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 9),
+    ("FONTSIZE", (0, 1), (-1, -1), 8),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+])
+
+
+def _pdf_row(p):
+    skills = json.loads(p.skills) if p.skills else []
+    return [
+        p.roll_number or "",
+        p.full_name,
+        p.department,
+        str(p.cgpa),
+        ", ".join(skills[:3]) + ("..." if len(skills) > 3 else ""),
+        str(round(p.employability_score, 2)),
+        p.placement_status,
+        "Yes" if p.is_verified else "No",
+    ]
+
+
+def _pdf_table(header, rows):
+    table = Table([header] + rows, repeatRows=1)
+    table.setStyle(PDF_TABLE_STYLE)
+    return table
+
+
+def generate_pdf_report(filters, output):
+    """Write a PDF report of student profiles matching the given filters.
+
+    ``output`` is a file path or a writable binary file object. Rows are
+    read in batches and laid out as one table per page.
+    """
     query = StudentProfile.query.join(User)
-    query = _apply_filters(query, filters)
-    profiles = query.all()
+    query = _apply_filters(query, filters).order_by(StudentProfile.id)
 
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=0.5 * inch, bottomMargin=0.5 * inch)
+    doc = SimpleDocTemplate(output, pagesize=landscape(A4), topMargin=0.5 * inch, bottomMargin=0.5 * inch)
     styles = getSampleStyleSheet()
     elements = []
 
@@ -79,40 +356,68 @@ def generate_pdf_report(filters):
     elements.append(Paragraph(f"Generated on {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}", styles["Normal"]))
     elements.append(Spacer(1, 0.25 * inch))
 
-    # Table header
     header = ["Roll No", "Name", "Dept", "CGPA", "Skills", "Score", "Status", "Verified"]
-    data = [header]
+    chunk = []
+    has_rows = False
 
-    for p in profiles:
-        skills = json.loads(p.skills) if p.skills else []
-        data.append([
-            p.roll_number or "",
-            p.full_name,
-            p.department,
-            str(p.cgpa),
-            ", ".join(skills[:3]) + ("..." if len(skills) > 3 else ""),
-            str(round(p.employability_score, 2)),
-            p.placement_status,
-            "Yes" if p.is_verified else "No",
-        ])
+    for p in query.yield_per(EXPORT_BATCH_SIZE):
+        chunk.append(_pdf_row(p))
+        if len(chunk) == PDF_ROWS_PER_TABLE:
+            elements.append(_pdf_table(header, chunk))
+            has_rows = True
+            chunk = []
+    if chunk:
+        elements.append(_pdf_table(header, chunk))
+        has_rows = True
 
-    if len(data) == 1:
+    if not has_rows:
         elements.append(Paragraph("No students match the selected filters.", styles["Normal"]))
-    else:
-        table = Table(data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1a1a2e")),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, 0), 9),
-            ("FONTSIZE", (0, 1), (-1, -1), 8),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.white]),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ]))
-        elements.append(table)
 
     doc.build(elements)
-    buffer.seek(0)
-    return buffer.getvalue()
+
+
+def generate_company_summary(filters):
+    """Aggregate verified student profiles for the company reports page.
+
+    Counts and averages are computed in SQL with a single GROUP BY over
+    department; results are cached per filter combination until profile
+    data changes.
+    """
+    filters = dict(filters, verified_only=True)
+    cache_key = tuple(sorted((k, str(v)) for k, v in filters.items() if v))
+    version = get_data_version()
+
+    with _summary_cache_lock:
+        cached = _summary_cache.get(cache_key)
+    if cached and cached[0] == version and time.monotonic() - cached[1] < SUMMARY_CACHE_TTL:
+        return dict(cached[2])
+
+    query = db.session.query(
+        StudentProfile.department,
+        func.count(StudentProfile.id),
+        func.coalesce(func.sum(StudentProfile.cgpa), 0.0),
+        func.coalesce(func.sum(StudentProfile.employability_score), 0.0),
+    )
+    query = _apply_filters(query, filters).group_by(StudentProfile.department)
+
+    total = 0
+    cgpa_sum = 0.0
+    score_sum = 0.0
+    breakdown = {}
+    for dept, count, dept_cgpa, dept_score in query.all():
+        dept_name = dept or "Unknown"
+        breakdown[dept_name] = breakdown.get(dept_name, 0) + count
+        total += count
+        cgpa_sum += dept_cgpa
+        score_sum += dept_score
+
+    summary = {
+        "total_students": total,
+        "average_cgpa": round(cgpa_sum / total, 2) if total else 0,
+        "average_score": round(score_sum / total, 2) if total else 0,
+        "department_breakdown": breakdown,
+    }
+
+    with _summary_cache_lock:
+        _summary_cache[cache_key] = (version, time.monotonic(), summary)
+    return dict(summary)
@@ -0,0 +1,220 @@
+"""Reference counting and garbage collection for content-addressed uploads.
+
+Uploads are stored under their SHA-256 (see utils/file_handler.py), so one
+file can back several profiles. Each flush that changes a StudentProfile's
+``resume_path``, ``photo_path`` or ``documents`` adjusts ``stored_files``
+reference counts in the same transaction. ``store_upload`` registers a
+file with zero references as soon as it is written, so an upload whose
+profile save never happens is collected too. Files without references are
+deleted by a background collector once they have been unreferenced (and
+not re-uploaded) for ``GC_GRACE``; it runs after commits that release a
+reference and every ``GC_PERIOD`` seconds.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, inspect, update
+from sqlalchemy.orm import Session
+
+from database import db
+from models.stored_file import StoredFile
+from models.student_profile import StudentProfile
+from utils.file_handler import remove_stored_file, resolve_upload_path, validate_and_save_file
+from utils.sql import upsert_increment
+
+FILE_FIELDS = ("resume_path", "photo_path", "documents")
+GC_GRACE = timedelta(minutes=10)
+GC_MIN_INTERVAL = 60  # seconds between background collections
+GC_PERIOD = 15 * 60  # seconds between scheduled collections
+
+_gc_executor = ThreadPoolExecutor(max_workers=1)
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+_gc_thread = None
+
+
+def _load_old_value_on_set(target, value, oldvalue, initiator):
+    pass
+
+
+for _field in FILE_FIELDS:
+    event.listen(getattr(StudentProfile, _field), "set", _load_old_value_on_set, active_history=True)
+
+
+def _references(resume_path, photo_path, documents):
+    refs = Counter(p for p in (resume_path, photo_path) if p)
+    try:
+        docs = json.loads(documents) if documents else []
+    except (json.JSONDecodeError, TypeError):
+        docs = []
+    if isinstance(docs, list):
+        refs.update(p for p in docs if isinstance(p, str) and p)
+    return refs
+
+
+def _previous_refs(obj):
+    state = inspect(obj)
+    values = []
+    for field in FILE_FIELDS:
+        history = state.attrs[field].history
+        if history.deleted:
+            values.append(history.deleted[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            values.append(state.attrs[field].value)
+    return _references(*values)
+
+
+def _current_refs(obj):
+    return _references(*(getattr(obj, f) for f in FILE_FIELDS))
+
+
+@event.listens_for(Session, "before_flush")
+def _count_file_references(session, flush_context, instances):
+    delta = Counter()
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, StudentProfile):
+                delta.update(_current_refs(obj))
+        for obj in session.deleted:
+            if isinstance(obj, StudentProfile):
+                delta.subtract(_previous_refs(obj))
+        for obj in session.dirty:
+            if isinstance(obj, StudentProfile) and session.is_modified(obj):
+                delta.update(_current_refs(obj))
+                delta.subtract(_previous_refs(obj))
+
+    changes = {path: n for path, n in delta.items() if n}
+    if not changes:
+        return
+
+    conn = session.connection()
+    table = StoredFile.__table__
+    now = datetime.utcnow()
+    for path, n in changes.items():
+        if n > 0:
+            upsert_increment(conn, table, {"path": path}, {"ref_count": n}, {"updated_at": now})
+        else:
+            # Files stored before reference counting have no row; they are never collected.
+            conn.execute(
+                update(table).where(table.c.path == path)
+                .values(ref_count=table.c.ref_count + n, updated_at=now)
+            )
+            session.info["uploads_released"] = True
+
+
+def store_upload(file, file_type, upload_folder):
+    """Validate and save an upload (see ``validate_and_save_file``) and register it.
+
+    The ``stored_files`` row is committed on its own, with zero references
+    until a profile flush counts one, so the file is collected if the
+    caller never references it. Returns the relative path.
+    """
+    path = validate_and_save_file(file, file_type, upload_folder)
+    with db.engine.begin() as conn:
+        upsert_increment(conn, StoredFile.__table__, {"path": path}, {"ref_count": 0},
+                         extra={"updated_at": datetime.utcnow()})
+    return path
+
+
+def _submit_collection(app):
+    global _last_gc
+    with _gc_lock:
+        if time.monotonic() - _last_gc < GC_MIN_INTERVAL:
+            return
+        _last_gc = time.monotonic()
+    _gc_executor.submit(_collect_in_background, app)
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_collection(session):
+    if session.info.pop("uploads_released", False) and has_app_context():
+        _submit_collection(current_app._get_current_object())
+
+
+def _collect_periodically(app):
+    while True:
+        _submit_collection(app)
+        time.sleep(GC_PERIOD)
+
+
+def schedule_upload_collection(app):
+    """Collect unreferenced uploads at startup and then every GC_PERIOD seconds.
+
+    Catches files whose grace period ends after the last commit that released a reference.
+    """
+    global _gc_thread
+    with _gc_lock:
+        if _gc_thread is not None:
+            return
+        _gc_thread = threading.Thread(target=_collect_periodically, args=(app,),
+                                      name="upload-collector", daemon=True)
+    _gc_thread.start()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_released(session):
+    session.info.pop("uploads_released", None)
+
+
+def _collect_in_background(app):
+    with app.app_context():
+        try:
+            collect_unreferenced_uploads(app.config["UPLOAD_FOLDER"])
+        except Exception as e:
+            print(f"[Uploads] Garbage collection failed: {e}")
+
+
+def _recently_written(abs_path, grace):
+    """True when the file was written within ``grace``, or cannot be inspected."""
+    try:
+        return time.time() - os.path.getmtime(abs_path) < grace.total_seconds()
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True
+
+
+def collect_unreferenced_uploads(upload_folder, grace=GC_GRACE):
+    """Delete stored files that have had no references for longer than ``grace``.
+
+    Returns the number of files removed.
+    """
+    cutoff = datetime.utcnow() - grace
+    table = StoredFile.__table__
+    candidates = [
+        row.path for row in
+        StoredFile.query.filter(StoredFile.ref_count <= 0, StoredFile.updated_at < cutoff).all()
+    ]
+
+    removed = 0
+    for path in candidates:
+        abs_path = resolve_upload_path(path, upload_folder)
+        if _recently_written(abs_path, grace):
+            # A recent re-upload of the same content refreshed the mtime; keep the file
+            # and its row, so a later collection still sees it.
+            continue
+
+        # Re-check the count atomically in case the file was referenced again meanwhile.
+        result = db.session.execute(delete(table).where(table.c.path == path, table.c.ref_count <= 0))
+        db.session.commit()
+        if not result.rowcount:
+            continue
+
+        if _recently_written(abs_path, grace):
+            # Re-uploaded between the check and the delete: restore the row we just removed
+            # (a no-op if the upload's own commit already recreated it).
+            upsert_increment(db.session.connection(), table, {"path": path}, {"ref_count": 0},
+                             extra={"updated_at": datetime.utcnow()})
+            db.session.commit()
+            continue
+        remove_stored_file(abs_path)
+        removed += 1
+    return removed
@@ -270,7 +270,20 @@ async function viewStudentDetail(id) {
 
 async function downloadReport(format) {
     const h = { 'Authorization': `Bearer ${token()}` };
-    const url = format === 'pdf' ? '/api/admin/reports/pdf' : '/api/admin/reports';
+    let url = '/api/admin/reports';
+    if (format === 'pdf') {
+        // PDFs are rendered in the background: queue the job, then poll until it is ready.
+        try {
+            let job = await api('/api/admin/reports/pdf', 'POST');
+            if (job.status !== 'done') showToast('Generating PDF report...');
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(r => setTimeout(r, 1500));
+                job = await api(`/api/admin/reports/jobs/${job.id}`);
+            }
+            if (job.status !== 'done') throw new Error(job.error || 'Report generation failed');
+            url = `/api/admin/reports/jobs/${job.id}/download`;
+        } catch (e) { showToast(e.message, 'error'); return; }
+    }
     const res = await fetch(`${API}${url}`, { headers: h });
     const blob = await res.blob();
     const a = document.createElement('a');
@@ -0,0 +1,100 @@
+"""Static asset fingerprinting and precompression.
+
+``build_assets()`` (run via ``python build_assets.py`` at deploy time)
+copies every file under static/ to static/dist/ with a content hash in its
+name, writes gzip (and, when the optional ``brotli`` package is installed,
+brotli) variants next to it, and records the mapping in
+static/dist/manifest.json. Fingerprinted files never change, so they are
+served with a one-year immutable Cache-Control.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".html", ".txt", ".ico", ".map"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_manifest = None
+
+
+def _fingerprinted_name(rel_path, digest):
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest[:12]}{ext}"
+
+
+def build_assets():
+    """Fingerprint and precompress everything under static/. Returns the manifest."""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != DIST_DIR]
+        for name in files:
+            src = os.path.join(root, name)
+            rel_path = os.path.relpath(src, STATIC_DIR).replace(os.sep, "/")
+            with open(src, "rb") as f:
+                data = f.read()
+
+            out_rel = _fingerprinted_name(rel_path, hashlib.sha256(data).hexdigest())
+            out_path = os.path.join(DIST_DIR, out_rel)
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, "wb") as f:
+                f.write(data)
+
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                with open(out_path + ".gz", "wb") as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(out_path + ".br", "wb") as f:
+                        f.write(brotli.compress(data, quality=11))
+
+            manifest[rel_path] = out_rel
+
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest():
+    """Return the asset manifest, or an empty dict when assets were not built."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(filename):
+    """URL for a static file: the fingerprinted copy when built, else the plain file."""
+    fingerprinted = load_manifest().get(filename)
+    if fingerprinted:
+        return f"/static/dist/{fingerprinted}"
+    return f"/static/{filename}"
+
+
+def precompressed_variant(path, accept_encoding):
+    """Pick the best precompressed sibling of ``path`` the client accepts.
+
+    Returns ``(path_to_send, content_encoding)``; the encoding is None when
+    the original file should be sent.
+    """
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in accept_encoding and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
@@ -1,7 +1,17 @@
+import glob
+import hashlib
 import os
+import tempfile
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
 from werkzeug.utils import secure_filename
 
+from utils.thumbnails import THUMBNAIL_FORMATS, THUMBNAIL_SIZES, thumbnail_path
+
 ALLOWED_EXTENSIONS = {
     "resume": {"pdf", "doc", "docx"},
     "photo": {"jpg", "jpeg", "png"},
@@ -15,12 +25,28 @@ MAX_SIZES = {
 }
 
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+THUMBNAIL_RETRY_AFTER = 300  # seconds before a photo whose thumbnails failed is tried again
+
+# Single background worker: thumbnails are cheap, but must never block the upload request
+_thumbnail_executor = ThreadPoolExecutor(max_workers=1)
+_thumbnail_lock = threading.Lock()
+_thumbnails_pending = set()  # photo paths queued or being processed
+_thumbnails_failed = {}  # photo path -> time.monotonic() of its last failure
+
+
 def _allowed_file(filename, file_type):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS.get(file_type, set())
 
 
 def validate_and_save_file(file, file_type, upload_folder):
-    """Validate file type/size and save to uploads/<file_type>/.
+    """Validate file type/size and save to uploads/<file_type>/<sha256>.<ext>.
+
+    The upload is streamed to a temp file in chunks while it is hashed; the
+    size limit is enforced as bytes arrive. Identical content maps to the
+    same path, so re-uploads are stored once and the URL never changes
+    meaning.
 
     Returns the relative path to the saved file, or raises ValueError.
     """
@@ -31,23 +57,140 @@ def validate_and_save_file(file, file_type, upload_folder):
         allowed = ", ".join(ALLOWED_EXTENSIONS.get(file_type, []))
         raise ValueError(f"File type not allowed. Accepted: {allowed}")
 
-    # Check file size
-    file.seek(0, os.SEEK_END)
-    size = file.tell()
-    file.seek(0)
-
     max_size = MAX_SIZES.get(file_type, 5 * 1024 * 1024)
-    if size > max_size:
-        raise ValueError(f"File too large. Max size: {max_size // (1024 * 1024)} MB")
+    ext = file.filename.rsplit(".", 1)[1].lower()
 
     # Build destination
     subdir = os.path.join(upload_folder, file_type)
+    tmp_dir = os.path.join(upload_folder, "tmp")
     os.makedirs(subdir, exist_ok=True)
+    os.makedirs(tmp_dir, exist_ok=True)
 
-    # Unique filename to avoid collisions
-    ext = file.filename.rsplit(".", 1)[1].lower()
-    safe_name = f"{uuid.uuid4().hex}.{ext}"
-    dest = os.path.join(subdir, safe_name)
-    file.save(dest)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+    try:
+        sha = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError(f"File too large. Max size: {max_size // (1024 * 1024)} MB")
+                sha.update(chunk)
+                out.write(chunk)
+
+        safe_name = f"{sha.hexdigest()}.{ext}"
+        dest = os.path.join(subdir, safe_name)
+        if os.path.exists(dest):
+            # Already stored: refresh mtime so garbage collection treats it as freshly used
+            os.utime(dest)
+        else:
+            os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if file_type == "photo":
+        schedule_thumbnails(dest)
 
     return f"uploads/{file_type}/{safe_name}"
+
+
+def resolve_upload_path(rel_path, upload_folder):
+    """Map a stored "uploads/<type>/<name>" path to its location on disk."""
+    return os.path.join(upload_folder, rel_path.split("/", 1)[1])
+
+
+def remove_stored_file(abs_path):
+    """Delete a stored upload together with any thumbnails generated for it."""
+    thumbs = [thumbnail_path(abs_path, size, fmt) for size in THUMBNAIL_SIZES for fmt in THUMBNAIL_FORMATS]
+    if os.path.exists(abs_path):
+        os.remove(abs_path)
+
+    # Thumbnails named before the source extension was part of the name are
+    # shared by every upload with the same content hash; keep them while one remains
+    directory, name = os.path.split(abs_path)
+    stem = os.path.splitext(name)[0]
+    if not glob.glob(os.path.join(glob.escape(directory), glob.escape(stem) + ".*")):
+        thumbs += [f"{directory}/thumbs/{stem}_{size}.{fmt}" for size in THUMBNAIL_SIZES for fmt in THUMBNAIL_FORMATS]
+
+    for thumb in thumbs:
+        if os.path.exists(thumb):
+            os.remove(thumb)
+
+
+def best_photo_variant(photo_path, size, fmt="png"):
+    """Return the pre-sized variant if it has been generated, else the original photo.
+
+    Photos uploaded before thumbnails existed get their variants scheduled here.
+    """
+    if not photo_path:
+        return None
+    thumb = thumbnail_path(photo_path, size, fmt)
+    if os.path.exists(thumb):
+        return thumb
+    if os.path.exists(photo_path):
+        schedule_thumbnails(photo_path)
+    return photo_path
+
+
+def generate_thumbnails(photo_path):
+    """Write every THUMBNAIL_SIZES x THUMBNAIL_FORMATS variant of a photo.
+
+    The photo is decoded once and resized from largest to smallest.
+    Variants that already exist are skipped.
+    """
+    targets = [(size, fmt) for size in THUMBNAIL_SIZES for fmt in THUMBNAIL_FORMATS]
+    if all(os.path.exists(thumbnail_path(photo_path, size, fmt)) for size, fmt in targets):
+        return
+
+    os.makedirs(os.path.dirname(thumbnail_path(photo_path, THUMBNAIL_SIZES[0])), exist_ok=True)
+    with Image.open(photo_path) as original:
+        img = ImageOps.exif_transpose(original)
+        img = img.convert("RGBA" if "A" in img.getbands() or img.mode == "P" else "RGB")
+
+        for size in sorted(THUMBNAIL_SIZES, reverse=True):
+            img.thumbnail((size, size), Image.LANCZOS)
+            for fmt in THUMBNAIL_FORMATS:
+                dest = thumbnail_path(photo_path, size, fmt)
+                tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+                if fmt == "webp":
+                    img.save(tmp, "WEBP", quality=80, method=4)
+                else:
+                    img.save(tmp, "PNG", optimize=True)
+                os.replace(tmp, dest)
+
+
+def _generate_thumbnails_safely(photo_path):
+    try:
+        generate_thumbnails(photo_path)
+    except Exception as e:
+        print(f"[Uploads] Could not generate thumbnails for '{photo_path}': {e}")
+        with _thumbnail_lock:
+            _thumbnails_failed[photo_path] = time.monotonic()
+    finally:
+        with _thumbnail_lock:
+            _thumbnails_pending.discard(photo_path)
+
+
+def schedule_thumbnails(photo_path):
+    """Generate the photo's thumbnails on the background worker.
+
+    Skipped while the photo is already queued, or for THUMBNAIL_RETRY_AFTER
+    seconds after its thumbnails failed (e.g. an image that cannot be decoded).
+    """
+    now = time.monotonic()
+    with _thumbnail_lock:
+        if photo_path in _thumbnails_pending:
+            return
+        failed_at = _thumbnails_failed.get(photo_path)
+        if failed_at is not None and now - failed_at < THUMBNAIL_RETRY_AFTER:
+            return
+        # Forget expired failures so the cache only holds recent ones
+        for path, failed_at in list(_thumbnails_failed.items()):
+            if now - failed_at >= THUMBNAIL_RETRY_AFTER:
+                del _thumbnails_failed[path]
+        _thumbnails_pending.add(photo_path)
+    _thumbnail_executor.submit(_generate_thumbnails_safely, photo_path)
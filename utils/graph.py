@@ -1,9 +1,38 @@
-import matplotlib.pyplot as plt
+import io
+import os
+
+import numpy as np
 import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 from PIL import Image
-import numpy as np
-import os
+
+CHART_DPI = 300
+
+_theme_applied = False
+
+
+def init_worker():
+    """Apply the seaborn theme once per process.
+
+    Used as the initializer of the chart rendering pool; the theme only
+    touches this process's rcParams, which every new Figure picks up.
+    """
+    global _theme_applied
+    if not _theme_applied:
+        sns.set_theme(style="whitegrid", context="talk")
+        _theme_applied = True
+
+
+def _to_png(fig):
+    """Render a Figure with the Agg canvas and return the PNG bytes."""
+    FigureCanvasAgg(fig)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=CHART_DPI)
+    return buffer.getvalue()
+
 
 def _add_image_annotation(ax, x, y, image_path, xybox_offset):
     """
@@ -34,13 +63,14 @@ def _add_image_annotation(ax, x, y, image_path, xybox_offset):
         print(f"Error loading image '{image_path}': {e}")
 
 
-def generate_cgpa_comparison(student_cgpa, dept_avg, photo_path=None, output_filename="cgpa_comparison.png"):
+def render_cgpa_comparison(student_cgpa, dept_avg, photo_path=None):
     """
-    Generates a bar graph comparing Student CGPA with Department Average CGPA.
+    Renders a bar graph comparing Student CGPA with Department Average CGPA.
+    Returns the PNG bytes.
     """
-    # Apply professional seaborn styling
-    sns.set_theme(style="whitegrid", context="talk")
-    fig, ax = plt.subplots(figsize=(8, 6))
+    init_worker()
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
 
     # Data
     labels = ['Student CGPA', 'Department Avg']
@@ -78,18 +108,17 @@ def generate_cgpa_comparison(student_cgpa, dept_avg, photo_path=None, output_fil
             xybox_offset=(0, 30)
         )
 
-    plt.tight_layout()
-    plt.savefig(output_filename, dpi=300)
-    plt.close()
+    return _to_png(fig)
 
 
-def generate_employability_graph(student_score, dept_avg_score, photo_path=None, output_filename="employability_score.png"):
+def render_employability_graph(student_score, dept_avg_score, photo_path=None):
     """
-    Generates a horizontal progress-style graph comparing Employability Score.
+    Renders a horizontal progress-style graph comparing Employability Score.
+    Returns the PNG bytes.
     """
-    # Apply seaborn styling
-    sns.set_theme(style="whitegrid", context="talk")
-    fig, ax = plt.subplots(figsize=(10, 4))
+    init_worker()
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
 
     # Data (Student placed on top for emphasis)
     labels = ['Department Avg', 'Student Score']  
@@ -128,6 +157,20 @@ def generate_employability_graph(student_score, dept_avg_score, photo_path=None,
             xybox_offset=(35, 0)
         )
 
-    plt.tight_layout()
-    plt.savefig(output_filename, dpi=300)
-    plt.close()
+    return _to_png(fig)
+
+
+def generate_cgpa_comparison(student_cgpa, dept_avg, photo_path=None, output_filename="cgpa_comparison.png"):
+    """
+    Generates a bar graph comparing Student CGPA with Department Average CGPA.
+    """
+    with open(output_filename, "wb") as f:
+        f.write(render_cgpa_comparison(student_cgpa, dept_avg, photo_path))
+
+
+def generate_employability_graph(student_score, dept_avg_score, photo_path=None, output_filename="employability_score.png"):
+    """
+    Generates a horizontal progress-style graph comparing Employability Score.
+    """
+    with open(output_filename, "wb") as f:
+        f.write(render_employability_graph(student_score, dept_avg_score, photo_path))
@@ -0,0 +1,87 @@
+"""Per-request identity context.
+
+Resolves the current user and student profile at most once per request
+(memoized on ``flask.g``). The ``user_id -> profile_id`` mapping is also
+kept in a small TTL cache shared across requests, and student tokens
+carry a ``profile_id`` claim, so most student endpoints load their
+profile with a primary-key lookup and no search by ``user_id``.
+Call ``invalidate_identity`` whenever a user's account changes.
+"""
+import threading
+import time
+
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from database import db
+from models.student_profile import StudentProfile
+from models.user import User
+
+IDENTITY_CACHE_TTL = 300  # seconds
+IDENTITY_CACHE_MAX_ENTRIES = 10000
+
+_profile_ids = {}  # user_id -> (profile_id, expires_at)
+_profile_ids_lock = threading.Lock()
+
+
+def _cached_profile_id(user_id):
+    with _profile_ids_lock:
+        entry = _profile_ids.get(user_id)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    return None
+
+
+def _cache_profile_id(user_id, profile_id):
+    with _profile_ids_lock:
+        if len(_profile_ids) >= IDENTITY_CACHE_MAX_ENTRIES:
+            _profile_ids.clear()
+        _profile_ids[user_id] = (profile_id, time.monotonic() + IDENTITY_CACHE_TTL)
+
+
+def invalidate_identity(user_id):
+    """Forget cached identity data of a user (call after editing or deactivating it)."""
+    with _profile_ids_lock:
+        _profile_ids.pop(user_id, None)
+
+
+def lookup_profile_id(user_id):
+    """Profile id of a user, from the shared cache or a single-column query."""
+    profile_id = _cached_profile_id(user_id)
+    if profile_id is None:
+        profile_id = db.session.query(StudentProfile.id).filter_by(user_id=user_id).scalar()
+        if profile_id is not None:
+            _cache_profile_id(user_id, profile_id)
+    return profile_id
+
+
+def current_user_id():
+    """Id of the JWT user of this request."""
+    if "identity_user_id" not in g:
+        g.identity_user_id = int(get_jwt_identity())
+    return g.identity_user_id
+
+
+def current_user():
+    """The User of this request, loaded once."""
+    if "identity_user" not in g:
+        g.identity_user = db.session.get(User, current_user_id())
+    return g.identity_user
+
+
+def current_profile():
+    """The StudentProfile of this request's user, loaded once; None when it has none."""
+    if "identity_profile" in g:
+        return g.identity_profile
+
+    user_id = current_user_id()
+    profile_id = get_jwt().get("profile_id") or lookup_profile_id(user_id)
+    profile = db.session.get(StudentProfile, profile_id) if profile_id else None
+    if profile is not None and profile.user_id != user_id:
+        # Stale claim or cache entry; fall back to the authoritative lookup
+        invalidate_identity(user_id)
+        profile_id = lookup_profile_id(user_id)
+        profile = db.session.get(StudentProfile, profile_id) if profile_id else None
+
+    g.identity_profile = profile
+    return profile
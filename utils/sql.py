@@ -0,0 +1,33 @@
+def _dialect_insert(conn, table):
+    """Return an INSERT construct supporting ON CONFLICT for the bound dialect."""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def upsert_increment(conn, table, keys, increments, extra=None):
+    """Add ``increments`` to the row identified by ``keys``, creating it if missing.
+
+    Runs as a single INSERT ... ON CONFLICT DO UPDATE so concurrent writers
+    (other threads or worker processes) never lose an update. ``keys`` must
+    match a primary key or unique constraint; ``extra`` holds plain values
+    (e.g. ``updated_at``) written on both insert and update.
+    """
+    extra = extra or {}
+    stmt = _dialect_insert(conn, table).values(**keys, **increments, **extra)
+    set_ = {col: table.c[col] + stmt.excluded[col] for col in increments}
+    set_.update({col: stmt.excluded[col] for col in extra})
+    stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_=set_)
+    conn.execute(stmt)
+
+
+def upsert(conn, table, keys, values):
+    """Insert a row identified by ``keys`` or overwrite ``values`` on the existing one."""
+    stmt = _dialect_insert(conn, table).values(**keys, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={col: stmt.excluded[col] for col in values},
+    )
+    conn.execute(stmt)
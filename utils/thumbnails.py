@@ -0,0 +1,31 @@
+"""Names of the pre-sized photo variants.
+
+Kept free of image-processing imports so models can refer to the
+variants; ``utils.file_handler`` generates them.
+"""
+import os
+
+# Pre-sized photo variants generated after upload (longest side in px)
+THUMBNAIL_SIZES = (64, 200, 400)
+THUMBNAIL_FORMATS = ("webp", "png")
+
+
+def thumbnail_path(photo_path, size, fmt="png"):
+    """Path of a pre-sized variant of an uploaded photo (it may not exist yet).
+
+    The name includes the source extension: uploads with the same content
+    hash but another extension are separate files with their own variants.
+    """
+    directory, name = os.path.split(photo_path)
+    stem, ext = os.path.splitext(name)
+    source = f"{stem}_{ext[1:].lower()}" if ext else stem
+    return f"{directory}/thumbs/{source}_{size}.{fmt}"
+
+
+def thumbnails_ready(photo_path):
+    """Whether every variant of the photo has been generated.
+
+    Variants are written largest first, so the smallest one in the last
+    format is the last to appear.
+    """
+    return os.path.exists(thumbnail_path(photo_path, min(THUMBNAIL_SIZES), THUMBNAIL_FORMATS[-1]))